@@ -17,7 +17,9 @@ import json
 import datetime
 import smtplib
 import logging
+from dataclasses import dataclass, asdict
 from decimal import Decimal
+from types import MappingProxyType
 from uuid import uuid4
 
 # --- Constants & Configuration ---
@@ -39,6 +41,26 @@ LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 logging.basicConfig(level=LOGGING_LEVEL, format=LOG_FORMAT)
 logger = logging.getLogger(__name__)
 
+# --- Request Payloads ---
+# Immutable, slotted containers for incoming orders. They can be built once
+# and reused (e.g. by load-test harnesses) without per-call dict construction.
+
+@dataclass(slots=True, frozen=True)
+class ShippingAddress:
+    name: str
+    street: str
+    city: str
+    state: str
+    zip: str
+
+@dataclass(slots=True, frozen=True)
+class OrderPayload:
+    user_id: str
+    items: tuple  # of read-only {'product_id': str, 'quantity': int} mappings
+    shipping_address: ShippingAddress
+    promo_code: str | None = None
+    payment_id: str | None = None
+
 # --- Mock Database Connection ---
 # In a real application, this would use a library like psycopg2 or sqlalchemy
 class MockDatabaseConnection:
@@ -80,8 +102,8 @@ class MockDatabaseConnection:
             logger.error("Cannot execute query: Not connected to database.")
             return None
         
-        logger.debug(f"Executing SQL Query: {sql}")
-        logger.debug(f"With Parameters: {params}")
+        logger.debug("Executing SQL Query: %s", sql)
+        logger.debug("With Parameters: %s", params)
         
         # --- SQL Query Mock Responses ---
         # This is where the "interdependent SQL" logic is simulated.
@@ -120,14 +142,20 @@ class MockDatabaseConnection:
                 'min_spend': Decimal('50.00')
             }]
             
-        if "SELECT * FROM orders WHERE order_date" in sql:
+        if "FROM daily_sales_summary WHERE report_date" in sql:
             # Mock for financial report
-            return [
-                {'order_id': 'order_mock_1', 'total_amount': Decimal('150.75'), 'status': 'COMPLETED'},
-                {'order_id': 'order_mock_2', 'total_amount': Decimal('88.20'), 'status': 'COMPLETED'},
-            ]
+            return [{
+                'report_date': params[0],
+                'order_count': 2,
+                'total_sales': Decimal('238.95'),
+                'total_revenue': Decimal('229.00'),
+            }]
+
+        if "FROM compensation_outbox" in sql:
+            # Mock for CompensationWorker.fetch_pending (nothing queued)
+            return []
 
-        logger.warning(f"No mock response defined for query: {sql}")
+        logger.warning("No mock response defined for query: %s", sql)
         return []
 
     def execute_commit(self, sql, params=None):
@@ -139,8 +167,35 @@ class MockDatabaseConnection:
             logger.error("Cannot execute commit: Not connected to database.")
             return 0
             
-        logger.debug(f"Executing SQL Commit: {sql}")
-        logger.debug(f"With Parameters: {params}")
+        logger.debug("Executing SQL Commit: %s", sql)
+        logger.debug("With Parameters: %s", params)
+        return self._mock_rows_affected(sql, params)
+
+    def execute(self, sql, params=None):
+        """
+        Simulates executing a data-changing statement inside the open transaction.
+        Nothing is committed until commit_transaction().
+        Returns the number of rows affected.
+        """
+        if not self.is_connected():
+            logger.error("Cannot execute statement: Not connected to database.")
+            return 0
+
+        logger.debug("Executing SQL in transaction: %s", sql)
+        logger.debug("With Parameters: %s", params)
+        return self._mock_rows_affected(sql, params)
+
+    def _mock_rows_affected(self, sql, params):
+        """Mock responses shared by execute_commit() and execute()."""
+        if sql.lstrip().startswith(("ALTER TABLE", "CREATE ")):
+            # Mock for apply_schema_migrations
+            logger.info("Mock DDL statement applied.")
+            return 0
+
+        if "REFRESH MATERIALIZED VIEW" in sql:
+            # Mock for refresh_daily_sales_summary
+            logger.info("Mock REFRESH of 'daily_sales_summary' successful.")
+            return 0
 
         if "INSERT INTO orders" in sql:
             # Mock for create_order_record
@@ -162,12 +217,22 @@ class MockDatabaseConnection:
             logger.info("Mock INSERT into 'order_status_history' successful.")
             return 1
             
+        if "INSERT INTO compensation_outbox" in sql:
+            # Mock for enqueue_compensation
+            logger.info("Mock INSERT into 'compensation_outbox' successful.")
+            return 1
+
+        if "UPDATE compensation_outbox" in sql:
+            # Mock for CompensationWorker
+            logger.info("Mock UPDATE on 'compensation_outbox' successful.")
+            return len(params[0])
+
         if "UPDATE orders SET status" in sql:
             # Mock for update_order_status
             logger.info("Mock UPDATE on 'orders' successful.")
             return 1
             
-        logger.warning(f"No mock response defined for commit query: {sql}")
+        logger.warning("No mock response defined for commit query: %s", sql)
         return 0
 
     def begin_transaction(self):
@@ -200,6 +265,72 @@ def get_db_connection():
         _db_connection.connect()
     return _db_connection
 
+# --- Schema Migrations ---
+# Reporting-side DDL. Applied once at service start; every statement is idempotent.
+
+SCHEMA_MIGRATIONS = [
+    # Persist revenue on the row instead of recomputing it in every report query.
+    """
+    ALTER TABLE orders
+    ADD COLUMN IF NOT EXISTS revenue NUMERIC
+    GENERATED ALWAYS AS (total_amount - shipping_cost + discount_amount) STORED;
+    """,
+    # Per-day rollup so the daily sales report is a single-row lookup.
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS daily_sales_summary AS
+    SELECT
+        DATE(order_date) AS report_date,
+        COUNT(*) AS order_count,
+        SUM(total_amount) AS total_sales,
+        SUM(revenue) AS total_revenue
+    FROM orders
+    WHERE status = 'COMPLETED'
+    GROUP BY DATE(order_date);
+    """,
+    # REFRESH ... CONCURRENTLY requires a unique index on the view.
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_daily_sales_summary_date
+    ON daily_sales_summary (report_date);
+    """,
+    # Low-stock report: partial index matches the WHERE/ORDER BY, and INCLUDE
+    # covers the projected product columns so the scan never touches the heap.
+    # (On MySQL, which lacks partial indexes, use (is_active, stock_level) instead.)
+    """
+    CREATE INDEX IF NOT EXISTS idx_products_active_stock
+    ON products (stock_level)
+    INCLUDE (product_id, name, supplier_id)
+    WHERE is_active = TRUE;
+    """,
+    # Durable queue of refunds owed after a post-payment failure.
+    # Drained out-of-band by CompensationWorker.
+    """
+    CREATE TABLE IF NOT EXISTS compensation_outbox (
+        id BIGSERIAL PRIMARY KEY,
+        transaction_id TEXT NOT NULL,
+        amount NUMERIC NOT NULL,
+        reason TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        processed_at TIMESTAMPTZ,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    );
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_compensation_outbox_pending
+    ON compensation_outbox (next_attempt_at)
+    WHERE processed_at IS NULL;
+    """,
+]
+
+def apply_schema_migrations(db_conn):
+    """
+    Applies SCHEMA_MIGRATIONS in order against the given connection.
+    """
+    logger.info(f"Applying {len(SCHEMA_MIGRATIONS)} schema migrations...")
+    for sql in SCHEMA_MIGRATIONS:
+        db_conn.execute_commit(sql)
+    logger.info("Schema migrations applied.")
+
 # --- Module: Payment Gateway ---
 
 class MockPaymentGateway:
@@ -317,11 +448,51 @@ class NotificationService:
         logger.info(f"Email successfully sent to {to_email} (simulated).")
         return True
 
-    def send_order_confirmation_email(self, user_details, order_details):
+    # Order confirmation templates, built once at class definition.
+    # Filled with str.format_map; item rows are rendered separately and joined.
+    _CONFIRMATION_TEXT_TPL = (
+        "Hello {first_name},\n\n"
+        "Thank you for your order! Your order ID is {order_id}.\n\n"
+        "Items:\n"
+        "{item_rows}"
+        "\nSubtotal: ${subtotal}"
+        "\nDiscount: -${discount_amount}"
+        "\nShipping: ${shipping_cost}"
+        "\nTotal: ${total_amount}\n\n"
+        "We'll notify you when your order ships.\n\n"
+        "Thanks,\nThe e-commerce Team"
+    )
+    _CONFIRMATION_TEXT_ROW = "- {name} (x{quantity}): ${line_total}\n"
+    _CONFIRMATION_HTML_TPL = (
+        "<html><body>"
+        "<h1>Hello, {first_name}!</h1>"
+        "<p>Thank you for your order! Your order ID is <strong>{order_id}</strong>.</p>"
+        "<h2>Order Summary</h2>"
+        "<table border='1' cellpadding='5' cellspacing='0'>"
+        "<tr><th>Item</th><th>Quantity</th><th>Price</th></tr>"
+        "{item_rows}"
+        "</table>"
+        "<p><strong>Subtotal:</strong> ${subtotal}</p>"
+        "<p><strong>Discount:</strong> -${discount_amount}</p>"
+        "<p><strong>Shipping:</strong> ${shipping_cost}</p>"
+        "<h2><strong>Total: ${total_amount}</strong></h2>"
+        "<p>We'll notify you when your order ships.</p>"
+        "<p>Thanks,<br>The e-commerce Team</p>"
+        "</body></html>"
+    )
+    _CONFIRMATION_HTML_ROW = "<tr><td>{name}</td><td>{quantity}</td><td>${line_total}</td></tr>"
+
+    def send_order_confirmation_email(self, user_details, totals, order_id, items):
         """
         A specific, interdependent function to format and send an order confirmation.
+        
+        Args:
+            user_details (dict): Must contain 'email'; 'first_name' is optional.
+            totals (dict): As returned by OrderProcessor.calculate_order_totals.
+            order_id (str): The confirmed order's ID.
+            items (list): Line items with 'name', 'quantity' and 'line_total'.
         """
-        logger.info(f"Generating order confirmation for order {order_details['order_id']}")
+        logger.info(f"Generating order confirmation for order {order_id}")
         
         user_email = user_details.get('email')
         first_name = user_details.get('first_name', 'Valued Customer')
@@ -330,38 +501,24 @@ class NotificationService:
             logger.error("Cannot send order confirmation: User email is missing.")
             return False
             
-        subject = f"Your e-commerce Order #{order_details['order_id']} is Confirmed!"
-        
-        # Build a simple text body
-        text_body = f"Hello {first_name},\n\n"
-        text_body += f"Thank you for your order! Your order ID is {order_details['order_id']}.\n\n"
-        text_body += "Items:\n"
-        for item in order_details['items']:
-            text_body += f"- {item['name']} (x{item['quantity']}): ${item['line_total']}\n"
-        text_body += f"\nSubtotal: ${order_details['subtotal']}"
-        text_body += f"\nDiscount: -${order_details['discount_amount']}"
-        text_body += f"\nShipping: ${order_details['shipping_cost']}"
-        text_body += f"\nTotal: ${order_details['total_amount']}\n\n"
-        text_body += "We'll notify you when your order ships.\n\n"
-        text_body += "Thanks,\nThe e-commerce Team"
+        subject = f"Your e-commerce Order #{order_id} is Confirmed!"
         
-        # Build a simple HTML body
-        html_body = f"<html><body>"
-        html_body += f"<h1>Hello, {first_name}!</h1>"
-        html_body += f"<p>Thank you for your order! Your order ID is <strong>{order_details['order_id']}</strong>.</p>"
-        html_body += "<h2>Order Summary</h2>"
-        html_body += "<table border='1' cellpadding='5' cellspacing='0'>"
-        html_body += "<tr><th>Item</th><th>Quantity</th><th>Price</th></tr>"
-        for item in order_details['items']:
-            html_body += f"<tr><td>{item['name']}</td><td>{item['quantity']}</td><td>${item['line_total']}</td></tr>"
-        html_body += "</table>"
-        html_body += f"<p><strong>Subtotal:</strong> ${order_details['subtotal']}</p>"
-        html_body += f"<p><strong>Discount:</strong> -${order_details['discount_amount']}</p>"
-        html_body += f"<p><strong>Shipping:</strong> ${order_details['shipping_cost']}</p>"
-        html_body += f"<h2><strong>Total: ${order_details['total_amount']}</strong></h2>"
-        html_body += "<p>We'll notify you when your order ships.</p>"
-        html_body += "<p>Thanks,<br>The e-commerce Team</p>"
-        html_body += "</body></html>"
+        text_row = self._CONFIRMATION_TEXT_ROW.format_map
+        html_row = self._CONFIRMATION_HTML_ROW.format_map
+        fields = {
+            'first_name': first_name,
+            'order_id': order_id,
+            'subtotal': totals['subtotal'],
+            'discount_amount': totals['discount_amount'],
+            'shipping_cost': totals['shipping_cost'],
+            'total_amount': totals['total_amount'],
+        }
+        
+        fields['item_rows'] = "".join([text_row(item) for item in items])
+        text_body = self._CONFIRMATION_TEXT_TPL.format_map(fields)
+        
+        fields['item_rows'] = "".join([html_row(item) for item in items])
+        html_body = self._CONFIRMATION_HTML_TPL.format_map(fields)
         
         return self.send_email(user_email, subject, html_body, text_body)
 
@@ -445,6 +602,10 @@ class InventoryManager:
         Updates the stock levels in the database for a new order.
         This is a critical, interdependent step.
         
+        Must run inside the caller's transaction: the UPDATEs are not committed
+        here, so a False return (or any later failure) is undone by the
+        caller's rollback.
+        
         Args:
             items_list (list): List of {'product_id': str, 'quantity': int}
             order_id (str): The ID of the order reserving the stock.
@@ -454,22 +615,6 @@ class InventoryManager:
         """
         logger.info(f"Reserving stock for order {order_id}")
         
-        # This logic should be transactional. 
-        # We check all items first, then update all items.
-        
-        # --- 1. Verification Phase ---
-        stock_checks = []
-        for item in items_list:
-            check = self.check_stock(item['product_id'], item['quantity'])
-            if not check['available']:
-                logger.error(f"Failed to reserve stock. Item {item['product_id']} is out of stock.")
-                # In a real app, you would roll back any reservations made so far.
-                return False
-            stock_checks.append(check)
-        
-        logger.info(f"All items for order {order_id} are available. Proceeding with reservation.")
-        
-        # --- 2. Reservation (Update) Phase ---
         # --- Interdependent SQL Query ---
         sql = """
         UPDATE products
@@ -481,43 +626,16 @@ class InventoryManager:
             quantity = item['quantity']
             product_id = item['product_id']
             
-            # The "AND stock_level >= %s" provides a final check (optimistic locking)
-            rows_affected = self.db.execute_commit(sql, (quantity, product_id, quantity))
+            # The "AND stock_level >= %s" is the real availability guard (optimistic locking)
+            rows_affected = self.db.execute(sql, (quantity, product_id, quantity))
             
             if rows_affected == 0:
                 logger.critical(f"Stock reservation FAILED for {product_id}. Race condition? Stock level may have changed.")
-                # This is a critical failure. We must roll back.
-                # We would call self.db.rollback_transaction() here.
-                # And we would need to un-reserve any items already updated.
-                self.rollback_stock_reservation(items_list, order_id, item['product_id'])
                 return False
                 
         logger.info(f"Stock successfully reserved for all items in order {order_id}.")
         return True
 
-    def rollback_stock_reservation(self, items_list, order_id, failed_at_product_id):
-        """
-        Helper function to roll back stock reservations if one item fails.
-        """
-        logger.warning(f"Rolling back stock reservation for order {order_id} due to failure at {failed_at_product_id}")
-        
-        # --- Interdependent SQL Query ---
-        sql = """
-        UPDATE products
-        SET stock_level = stock_level + %s
-        WHERE product_id = %s;
-        """
-        
-        for item in items_list:
-            if item['product_id'] == failed_at_product_id:
-                # Don't roll back the one that failed (it never got decremented)
-                break 
-            
-            logger.info(f"Restoring stock for {item['product_id']} by {item['quantity']}")
-            self.db.execute_commit(sql, (item['quantity'], item['product_id']))
-            
-        logger.error(f"Stock reservation for order {order_id} has been rolled back.")
-
 # --- Module: Order Processing ---
 
 class OrderProcessor:
@@ -630,7 +748,8 @@ class OrderProcessor:
     def create_order_record(self, order_id, user_id, totals, items, shipping_address, payment_transaction_id):
         """
         Writes the final, confirmed order to the database.
-        This is a highly interdependent function.
+        This is a highly interdependent function. Runs inside the caller's
+        transaction; nothing is committed here.
         
         Returns:
             bool: True on success, False on failure.
@@ -655,11 +774,11 @@ class OrderProcessor:
             totals['subtotal'],
             totals['discount_amount'],
             totals['shipping_cost'],
-            json.dumps(shipping_address),
+            json.dumps(asdict(shipping_address)),
             payment_transaction_id
         )
         
-        if self.db.execute_commit(order_sql, order_params) == 0:
+        if self.db.execute(order_sql, order_params) == 0:
             logger.critical(f"Failed to INSERT master order record for {order_id}. This is a critical error.")
             return False
             
@@ -679,29 +798,46 @@ class OrderProcessor:
                 item['unit_price'],
                 item['line_total']
             )
-            if self.db.execute_commit(items_sql, item_params) == 0:
+            if self.db.execute(items_sql, item_params) == 0:
                  logger.critical(f"Failed to INSERT order_item {item['product_id']} for {order_id}.")
-                 # In a real app, the transaction would roll back this entire function.
                  return False
                  
         logger.info(f"Successfully created all database records for order {order_id}")
         return True
 
-    def process_new_order(self, user_id, items, shipping_address, promo_code=None, payment_id=None):
+    def enqueue_compensation(self, transaction_id, amount, reason):
+        """
+        Records a refund owed to the customer in compensation_outbox.
+        Runs in its own short transaction so it survives the order rollback.
+        """
+        # --- Interdependent SQL Query ---
+        sql = """
+        INSERT INTO compensation_outbox (transaction_id, amount, reason)
+        VALUES (%s, %s, %s);
+        """
+        self.db.begin_transaction()
+        if self.db.execute(sql, (transaction_id, amount, reason)) == 0:
+            self.db.rollback_transaction()
+            logger.critical(f"!!! FAILED TO QUEUE REFUND for {transaction_id} !!!")
+            return False
+        self.db.commit_transaction()
+        return True
+
+    def process_new_order(self, payload):
         """
         This is the main "god function" that coordinates everything.
         
         Args:
-            user_id (str): The user placing the order.
-            items (list): List of {'product_id': str, 'quantity': int}
-            shipping_address (dict): Full shipping address.
-            promo_code (str, optional): A promotion code.
-            payment_id (str, optional): A specific payment ID. If None, use user's default.
+            payload (OrderPayload): The order to place. If payload.payment_id
+                                    is None, the user's default is used.
             
         Returns:
             dict: {'success': bool, 'order_id': str, 'message': str}
         """
-        logger.info(f"--- NEW ORDER RECEIVED --- User: {user_id}, Items: {len(items)}")
+        user_id = payload.user_id
+        items = payload.items
+        payment_id = payload.payment_id
+        logger.info("--- NEW ORDER RECEIVED --- User: %s, Items: %s", user_id, len(items))
         
         # Start a database transaction
         self.db.begin_transaction()
@@ -741,11 +877,19 @@ class OrderProcessor:
             logger.info("All items are in stock.")
             
             # --- 3. Calculate Totals & Apply Promotions ---
-            promotion = self.get_promotion_details(promo_code)
+            promotion = self.get_promotion_details(payload.promo_code)
             totals = self.calculate_order_totals(items_with_details, promotion)
             
-            # --- 4. Charge Customer ---
-            logger.info(f"Attempting to charge customer {totals['total_amount']}...")
+            # --- 4. Reserve Stock (Critical Section) ---
+            # Reserve *before* charging: the conditional UPDATEs hold the stock
+            # inside this transaction, so a failure here (or a declined card
+            # below) is undone by a plain rollback with nothing to refund.
+            new_order_id = f"ord_{uuid4()}"
+            if not self.inventory_manager.reserve_stock(items_with_details, new_order_id):
+                raise ValueError("Stock reservation failed. Stock level may have changed.")
+            
+            # --- 5. Charge Customer ---
+            logger.info("Attempting to charge customer %s...", totals['total_amount'])
             charge_response = self.payment_gateway.charge(
                 amount=totals['total_amount'],
                 payment_token=payment_token
@@ -755,15 +899,7 @@ class OrderProcessor:
                 raise Exception(f"Payment failed: {charge_response['error']}")
                 
             transaction_id = charge_response['transaction_id']
-            logger.info(f"Payment successful. Transaction: {transaction_id}")
-            
-            # --- 5. Reserve Stock (Critical Section) ---
-            # This is the point of no return for the database transaction.
-            # If this fails, we must refund the payment.
-            new_order_id = f"ord_{uuid4()}"
-            if not self.inventory_manager.reserve_stock(items_with_details, new_order_id):
-                # This is a critical failure. Stock reservation failed after payment.
-                raise Exception("Stock reservation failed post-payment. Critical error.")
+            logger.info("Payment successful. Transaction: %s", transaction_id)
             
             # --- 6. Create Order Record in Database ---
             if not self.create_order_record(
@@ -771,7 +907,7 @@ class OrderProcessor:
                 user_id=user_id,
                 totals=totals,
                 items=items_with_details,
-                shipping_address=shipping_address,
+                shipping_address=payload.shipping_address,
                 payment_transaction_id=transaction_id
             ):
                 raise Exception("Failed to write order record to database. Critical error.")
@@ -781,41 +917,129 @@ class OrderProcessor:
             
             # --- 8. Send Notifications (Post-Transaction) ---
             # This is done *after* the commit so we don't email for a failed order.
-            order_details_for_email = totals.copy()
-            order_details_for_email['order_id'] = new_order_id
-            order_details_for_email['items'] = items_with_details
+            self.notifier.send_order_confirmation_email(user_details, totals, new_order_id, items_with_details)
             
-            self.notifier.send_order_confirmation_email(user_details, order_details_for_email)
-            
-            logger.info(f"--- ORDER {new_order_id} PROCESSED SUCCESSFULLY ---")
+            logger.info("--- ORDER %s PROCESSED SUCCESSFULLY ---", new_order_id)
             return {'success': True, 'order_id': new_order_id, 'message': 'Order processed successfully.'}
             
         except Exception as e:
             # --- Handle All Errors ---
-            logger.error(f"Order processing failed: {e}")
+            logger.error("Order processing failed: %s", e)
             
             # Roll back all database changes (stock, order records, etc.)
             self.db.rollback_transaction()
             logger.warning("Database transaction has been rolled back.")
             
-            # If payment was charged but something *after* failed (e.g., stock reservation),
-            # we MUST issue a refund.
+            # Stock is reserved before charging, so the only post-payment failure
+            # left is the order record write. Queue a refund for that case;
+            # CompensationWorker drains the outbox and alerts the dev team on failures.
             if 'transaction_id' in locals() and transaction_id:
-                logger.critical(f"Issuing emergency refund for {transaction_id} due to post-payment failure.")
-                refund_response = self.payment_gateway.refund(transaction_id, totals['total_amount'])
-                if not refund_response['success']:
-                    logger.critical(f"!!! EMERGENCY REFUND FAILED: {refund_response['error']} !!!")
-                    # This requires manual intervention.
-                    # Send an alert to the dev team.
-                    self.notifier.send_email(
-                        "devops@ecommerce.com", 
-                        "CRITICAL: REFUND FAILED", 
-                        f"Refund failed for {transaction_id}. Please investigate immediately.",
-                        f"Refund failed for {transaction_id}. Please investigate immediately."
-                    )
+                logger.critical("Queueing compensating refund for %s due to post-payment failure.", transaction_id)
+                self.enqueue_compensation(transaction_id, totals['total_amount'], str(e))
             
             return {'success': False, 'order_id': None, 'message': str(e)}
 
+# --- Module: Compensation Outbox ---
+
+class CompensationWorker:
+    """
+    Drains compensation_outbox: issues queued refunds in batches and sends
+    one aggregated alert per drain for any that fail.
+    Failed rows are retried with exponential backoff.
+    """
+    def __init__(self, db_conn, payment_gateway, notifier, batch_size=100):
+        self.db = db_conn
+        self.payment_gateway = payment_gateway
+        self.notifier = notifier
+        self.batch_size = batch_size
+        logger.info("Compensation Worker initialized.")
+
+    def fetch_pending(self):
+        """
+        Fetches and row-locks a batch of unprocessed rows that are due for an attempt.
+        Call inside a transaction; the locks last only as long as it does.
+        """
+        # --- Interdependent SQL Query ---
+        sql = """
+        SELECT id, transaction_id, amount, reason, attempts
+        FROM compensation_outbox
+        WHERE processed_at IS NULL AND next_attempt_at <= NOW()
+        ORDER BY next_attempt_at
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED;
+        """
+        return self.db.execute_query(sql, (self.batch_size,)) or []
+
+    def _refund_all(self, rows):
+        """
+        Refunds every row, using the gateway's batch API when it has one.
+        Returns a list of (row, response) pairs.
+        """
+        refund_batch = getattr(self.payment_gateway, 'refund_batch', None)
+        if refund_batch is not None:
+            responses = refund_batch([(r['transaction_id'], r['amount']) for r in rows])
+            return list(zip(rows, responses))
+        return [(r, self.payment_gateway.refund(r['transaction_id'], r['amount'])) for r in rows]
+
+    def drain_once(self):
+        """
+        Processes one batch from the outbox.
+        
+        Returns:
+            dict: {'processed': int, 'failed': int}
+        """
+        # The batch is selected inside the transaction, so its FOR UPDATE SKIP LOCKED
+        # row locks are held until the outcome updates commit. A concurrent worker
+        # skips these rows instead of refunding them a second time.
+        self.db.begin_transaction()
+        try:
+            rows = self.fetch_pending()
+            if not rows:
+                self.db.commit_transaction()
+                return {'processed': 0, 'failed': 0}
+
+            logger.info(f"Draining {len(rows)} queued refunds...")
+
+            succeeded, failed = [], []
+            for row, response in self._refund_all(rows):
+                if response['success']:
+                    succeeded.append(row)
+                else:
+                    failed.append((row, response['error']))
+
+            if succeeded:
+                # --- Interdependent SQL Query ---
+                sql = "UPDATE compensation_outbox SET processed_at = NOW() WHERE id = ANY(%s);"
+                self.db.execute(sql, ([r['id'] for r in succeeded],))
+
+            if failed:
+                # --- Interdependent SQL Query ---
+                sql = """
+                UPDATE compensation_outbox
+                SET attempts = attempts + 1,
+                    next_attempt_at = NOW() + INTERVAL '1 minute' * POWER(2, attempts)
+                WHERE id = ANY(%s);
+                """
+                self.db.execute(sql, ([r['id'] for r, _ in failed],))
+
+            self.db.commit_transaction()
+        except Exception:
+            self.db.rollback_transaction()
+            raise
+
+        if failed:
+            logger.critical(f"!!! {len(failed)} QUEUED REFUNDS FAILED !!!")
+            lines = [f"{r['transaction_id']} ({r['amount']}): {error}" for r, error in failed]
+            body = "Refunds failed for the following transactions. Please investigate.\n" + "\n".join(lines)
+            self.notifier.send_email(
+                "devops@ecommerce.com",
+                f"CRITICAL: {len(failed)} REFUNDS FAILED",
+                body,
+                body
+            )
+
+        return {'processed': len(succeeded), 'failed': len(failed)}
+
 # --- Module: Reporting ---
 
 class ReportingService:
@@ -830,53 +1054,55 @@ class ReportingService:
     def generate_daily_sales_report(self, report_date):
         """
         Generates a summary of sales for a specific date.
+        Reads the precomputed row from daily_sales_summary rather than
+        aggregating the orders table on every call.
         """
-        logger.info(f"Generating sales report for {report_date}")
+        logger.info("Generating sales report for %s", report_date)
         
         # --- Interdependent SQL Query ---
         sql = """
         SELECT 
-            order_id, 
-            total_amount, 
-            discount_amount, 
-            shipping_cost,
-            (total_amount - shipping_cost + discount_amount) AS revenue,
-            status
-        FROM 
-            orders
-        WHERE 
-            status = 'COMPLETED' AND DATE(order_date) = %s;
+            report_date, 
+            order_count, 
+            total_sales, 
+            total_revenue
+        FROM daily_sales_summary WHERE report_date = %s;
         """
         
         results = self.db.execute_query(sql, (report_date,))
         
         if not results:
-            logger.warning(f"No completed orders found for {report_date}.")
-            return {'total_sales': 0, 'total_revenue': 0, 'order_count': 0, 'orders': []}
+            logger.warning("No completed orders found for %s.", report_date)
+            return {'report_date': report_date, 'total_sales': 0, 'total_revenue': 0, 'order_count': 0}
             
-        total_sales = Decimal('0.00')
-        total_revenue = Decimal('0.00')
-        order_count = len(results)
-        
-        for order in results:
-            total_sales += order['total_amount']
-            total_revenue += order['revenue'] # Mock revenue calculation
+        summary = results[0]
+        total_sales = summary['total_sales']
+        total_revenue = summary['total_revenue']
+        order_count = summary['order_count']
             
-        logger.info(f"Report for {report_date}: Orders={order_count}, Total Sales=${total_sales}, Total Revenue=${total_revenue}")
+        logger.info("Report for %s: Orders=%s, Total Sales=$%s, Total Revenue=$%s", report_date, order_count, total_sales, total_revenue)
         
         return {
             'report_date': report_date,
             'total_sales': total_sales,
             'total_revenue': total_revenue,
-            'order_count': order_count,
-            'orders': results
+            'order_count': order_count
         }
+
+    def refresh_daily_sales_summary(self):
+        """
+        Rebuilds daily_sales_summary without blocking concurrent readers.
+        Call this after orders transition to COMPLETED.
+        """
+        logger.info("Refreshing daily_sales_summary...")
+        sql = "REFRESH MATERIALIZED VIEW CONCURRENTLY daily_sales_summary;"
+        self.db.execute_commit(sql)
         
     def generate_low_stock_report(self, threshold=10):
         """
         Generates a report of all products with stock below a threshold.
         """
-        logger.info(f"Generating low stock report (threshold: {threshold})")
+        logger.info("Generating low stock report (threshold: %s)", threshold)
         
         # --- Interdependent SQL Query ---
         sql = """
@@ -902,7 +1128,7 @@ class ReportingService:
             logger.info("No items are low on stock. Good job!")
             return {'count': 0, 'items': []}
             
-        logger.warning(f"Found {len(low_stock_items)} items low on stock.")
+        logger.warning("Found %s items low on stock.", len(low_stock_items))
         
         # We could auto-email this report
         # self.notifier.send_email(...)
@@ -913,6 +1139,37 @@ class ReportingService:
             'items': low_stock_items
         }
 
+# --- Simulation Payloads ---
+# These are the "payloads" that would come from a web API.
+# Built once at import and reused by every simulation run.
+
+SIM_ORDER_PAYLOAD_1 = OrderPayload(
+    user_id='user_12345',
+    items=(
+        MappingProxyType({'product_id': 'prod_abc', 'quantity': 2}),
+        MappingProxyType({'product_id': 'prod_xyz', 'quantity': 1}),
+    ),
+    shipping_address=ShippingAddress('John Doe', '123 Main St', 'Anytown', 'CA', '12345'),
+    promo_code='WINTER10' # This is the 10% off code
+)
+
+SIM_ORDER_PAYLOAD_2 = OrderPayload(
+    user_id='user_67890',
+    items=(
+        MappingProxyType({'product_id': 'prod_abc', 'quantity': 9999}), # This will fail
+    ),
+    shipping_address=ShippingAddress('Jane Smith', '456 Oak Ave', 'Otherville', 'NY', '67890'),
+)
+
+# We need to get a user and payment method that *will* fail
+# We'll cheat and just set the payment_id directly to a known failing token
+SIM_ORDER_PAYLOAD_3 = OrderPayload(
+    user_id='user_12345',
+    items=(MappingProxyType({'product_id': 'prod_abc', 'quantity': 1}),),
+    shipping_address=SIM_ORDER_PAYLOAD_1.shipping_address,
+    payment_id='payment_token_fail_card_declined' # This will fail
+)
+
 # --- Main Application Execution ---
 
 def main_simulation():
@@ -924,6 +1181,7 @@ def main_simulation():
     
     # --- 1. Initialization (Dependency Injection) ---
     db_conn = get_db_connection()
+    apply_schema_migrations(db_conn)
     inventory_mgr = InventoryManager(db_conn)
     payment_gw = MockPaymentGateway(api_key="pk_live_mock_key")
     notifier_svc = NotificationService()
@@ -936,67 +1194,36 @@ def main_simulation():
     )
     
     reporting_svc = ReportingService(db_conn)
+    compensation_worker = CompensationWorker(db_conn, payment_gw, notifier_svc)
     
     logger.info("All services initialized.")
     
     # --- 2. Simulate a Successful Order ---
     logger.info("\n--- SIMULATION 1: Successful Order ---")
     
-    # This is the "payload" that would come from a web API
-    order_payload_1 = {
-        'user_id': 'user_12345',
-        'items': [
-            {'product_id': 'prod_abc', 'quantity': 2},
-            {'product_id': 'prod_xyz', 'quantity': 1}
-        ],
-        'shipping_address': {
-            'name': 'John Doe',
-            'street': '123 Main St',
-            'city': 'Anytown',
-            'state': 'CA',
-            'zip': '12345'
-        },
-        'promo_code': 'WINTER10' # This is the 10% off code
-    }
-    
-    result_1 = order_processor.process_new_order(**order_payload_1)
+    result_1 = order_processor.process_new_order(SIM_ORDER_PAYLOAD_1)
     print(f"Simulation 1 Result: {result_1}")
     
     # --- 3. Simulate a Failed Order (Insufficient Stock) ---
     logger.info("\n--- SIMULATION 2: Failed Order (Insufficient Stock) ---")
     
-    order_payload_2 = {
-        'user_id': 'user_67890',
-        'items': [
-            {'product_id': 'prod_abc', 'quantity': 9999} # This will fail
-        ],
-        'shipping_address': { 'name': 'Jane Smith', 'street': '456 Oak Ave', 'city': 'Otherville', 'state': 'NY', 'zip': '67890' },
-        'promo_code': None
-    }
-    
-    result_2 = order_processor.process_new_order(**order_payload_2)
+    result_2 = order_processor.process_new_order(SIM_ORDER_PAYLOAD_2)
     print(f"Simulation 2 Result: {result_2}")
     
     # --- 4. Simulate a Failed Order (Payment Declined) ---
     logger.info("\n--- SIMULATION 3: Failed Order (Payment Declined) ---")
     
-    # We need to get a user and payment method that *will* fail
-    # We'll cheat and just set the payment_id directly to a known failing token
-    
-    order_payload_3 = {
-        'user_id': 'user_12345',
-        'items': [{'product_id': 'prod_abc', 'quantity': 1}],
-        'shipping_address': { 'name': 'John Doe', 'street': '123 Main St', 'city': 'Anytown', 'state': 'CA', 'zip': '12345' },
-        'payment_id': 'payment_token_fail_card_declined' # This will fail
-    }
-    
-    result_3 = order_processor.process_new_order(**order_payload_3)
+    result_3 = order_processor.process_new_order(SIM_ORDER_PAYLOAD_3)
     print(f"Simulation 3 Result: {result_3}")
     
+    # In production this runs on a schedule in a separate worker process.
+    compensation_worker.drain_once()
+    
     # --- 5. Simulate Generating Reports ---
     logger.info("\n--- SIMULATION 4: Generate Reports ---")
     
     today = datetime.date.today().isoformat()
+    reporting_svc.refresh_daily_sales_summary()
     sales_report = reporting_svc.generate_daily_sales_report(today)
     print(f"Sales Report for {today}:")
     # Using json.dumps for pretty printing the decimal-containing dict
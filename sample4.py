@@ -15,14 +15,20 @@ Version: 1.0.0
 # Standard Library Imports
 import sqlite3
 import logging
-import datetime
 import hashlib
+import hmac
 import json
+import os
+import queue
+import threading
 import uuid
 import re
-from decimal import Decimal, getcontext
-from typing import List, Dict, Any, Optional, Tuple, Union
-from collections import namedtuple
+import time
+from decimal import Decimal, ROUND_HALF_UP, getcontext
+from typing import List, Dict, Any, Optional, Tuple, Iterable
+from collections import namedtuple, OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache, wraps
 
 # Set precision for Decimal operations
 getcontext().prec = 10
@@ -31,6 +37,25 @@ getcontext().prec = 10
 
 # Database Configuration
 DB_NAME = 'ecommerce_main.db'
+# Prepared statements kept per connection, keyed by SQL text. Sized to hold
+# every distinct query in this module so hot SQL is never re-parsed, including
+# one variant per row count (up to MAX_ORDER_ITEMS) of each multi-row statement.
+DB_CACHED_STATEMENTS = 512
+# Connections kept per DatabaseManager, and how long a thread waits for one
+# to be returned once all of them are lent out.
+DB_POOL_SIZE = 8
+DB_POOL_TIMEOUT_SECONDS = 30
+# Applied to every new connection. WAL lets readers run alongside the writer,
+# and synchronous=NORMAL is still durable in WAL mode without an fsync per commit.
+DB_PRAGMAS = """
+PRAGMA journal_mode = WAL;
+PRAGMA synchronous = NORMAL;
+PRAGMA temp_store = MEMORY;
+PRAGMA mmap_size = 268435456;
+PRAGMA cache_size = -65536;
+PRAGMA busy_timeout = 5000;
+PRAGMA foreign_keys = ON;
+"""
 
 # Logging Configuration
 logging.basicConfig(level=logging.INFO,
@@ -40,12 +65,31 @@ logger = logging.getLogger(__name__)
 
 # Application Constants
 DEFAULT_CURRENCY = 'USD'
-PASSWORD_SALT = 'a_very_secret_ecommerce_salt_string'
+PASSWORD_SALT = 'a_very_secret_ecommerce_salt_string'  # Used as a pepper, on top of per-user salts
+PASSWORD_SALT_BYTES = 16
+SCRYPT_N, SCRYPT_R, SCRYPT_P, SCRYPT_DKLEN = 2**14, 8, 1, 32
 MIN_PASSWORD_LENGTH = 8
 MAX_ORDER_ITEMS = 50
-SHIPPING_FEE_STANDARD = Decimal('5.99')
-SHIPPING_FEE_EXPRESS = Decimal('15.99')
-FREE_SHIPPING_THRESHOLD = Decimal('100.00')
+# Rows per multi-row INSERT in bulk loads (6 parameters each, well under SQLite's limit)
+BULK_INSERT_ROWS = 500
+ROLE_CACHE_SIZE = 1024
+ROLE_CACHE_TTL_SECONDS = 60
+PRODUCT_CACHE_SIZE = 1024
+PRODUCT_CACHE_TTL_SECONDS = 30
+PRODUCT_PREWARM_COUNT = 512
+REPORT_CACHE_SIZE = 256
+REPORT_CACHE_TTL_SECONDS = 60
+# Money is handled as integer cents internally; Decimal only at the API boundary
+SHIPPING_FEE_STANDARD = 599
+SHIPPING_FEE_EXPRESS = 1599
+FREE_SHIPPING_THRESHOLD = 10000
+# (method, qualifies for free shipping) -> fee in cents; other methods pay standard
+SHIPPING_FEES = {
+    ('STANDARD', True): 0,
+    ('STANDARD', False): SHIPPING_FEE_STANDARD,
+    ('EXPRESS', True): SHIPPING_FEE_EXPRESS,
+    ('EXPRESS', False): SHIPPING_FEE_EXPRESS,
+}
 
 # Order Statuses (simulating an Enum)
 STATUS_PENDING = 'PENDING'
@@ -71,7 +115,7 @@ class ValidationError(ValueError):
     """Exception raised for data validation failures."""
     pass
 
-class AuthenticationError(SecurityException):
+class AuthenticationError(Exception):
     """Exception raised for auth failures."""
     pass
 
@@ -92,38 +136,106 @@ class DatabaseManager:
     This class is instantiated and used by all other services.
     """
 
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, pool_size: int = DB_POOL_SIZE):
         """
         Initializes the database manager.
         :param db_path: Filesystem path to the SQLite database.
+        :param pool_size: Maximum number of connections to keep open.
         """
         self.db_path = db_path
-        self.connection = None
-        logger.info(f"DatabaseManager initialized for: {db_path}")
+        self.pool_size = pool_size
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._pool_lock = threading.Lock()
+        self._local = threading.local()
+        logger.info("DatabaseManager initialized for: %s", db_path)
 
-    def connect(self) -> sqlite3.Connection:
+    def _open_connection(self) -> sqlite3.Connection:
         """
-        Establishes and returns a database connection.
+        Opens and configures a new connection for the pool.
         """
         try:
-            if not self.connection or self.connection.total_changes == -1:
-                self.connection = sqlite3.connect(self.db_path)
-                self.connection.row_factory = sqlite3.Row
-                self.connection.execute("PRAGMA foreign_keys = ON;")
-                logger.info("New database connection established.")
-            return self.connection
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None,
+                                   cached_statements=DB_CACHED_STATEMENTS)
+            conn.row_factory = sqlite3.Row
+            conn.executescript(DB_PRAGMAS)
+            logger.info("New database connection established.")
+            return conn
         except sqlite3.Error as e:
-            logger.error(f"Failed to connect to database at {self.db_path}: {e}")
+            logger.error("Failed to connect to database at %s: %s", self.db_path, e)
             raise DatabaseError(f"Database connection failure: {e}")
 
-    def disconnect(self):
+    def _checkout(self) -> sqlite3.Connection:
         """
-        Closes the database connection if it exists.
+        Takes an idle connection, opening a new one while under pool_size,
+        otherwise waiting for another thread to return one.
         """
-        if self.connection:
-            self.connection.close()
-            self.connection = None
-            logger.info("Database connection closed.")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._pool_lock:
+            can_open = self._opened < self.pool_size
+            if can_open:
+                self._opened += 1
+        if can_open:
+            try:
+                return self._open_connection()
+            except DatabaseError:
+                with self._pool_lock:
+                    self._opened -= 1
+                raise
+        try:
+            return self._idle.get(timeout=DB_POOL_TIMEOUT_SECONDS)
+        except queue.Empty:
+            raise DatabaseError(f"No database connection available after {DB_POOL_TIMEOUT_SECONDS}s.")
+
+    @contextmanager
+    def acquire(self):
+        """
+        Lends a pooled connection to the calling thread for the block.
+        Re-entrant: nested acquire() calls on the same thread get the connection
+        already lent, so helpers called inside a transaction() join it.
+        :return: A context manager yielding a sqlite3.Connection.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield conn
+            return
+        conn = self._checkout()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    def connect(self) -> None:
+        """
+        Opens the first pooled connection if none is open yet, so connection
+        problems surface at startup rather than on the first query.
+        """
+        with self.acquire():
+            pass
+
+    def disconnect(self):
+        """
+        Closes every idle connection in the pool.
+        """
+        closed = 0
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            closed += 1
+        with self._pool_lock:
+            self._opened -= closed
+        if closed:
+            logger.info("Closed %d database connection(s).", closed)
 
     def execute_query(self, query: str, params: tuple = ()) -> List[sqlite3.Row]:
         """
@@ -132,16 +244,36 @@ class DatabaseManager:
         :param params: A tuple of parameters to bind to the query.
         :return: A list of sqlite3.Row objects.
         """
-        conn = self.connect()
         try:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute(query, params)
-                results = cursor.fetchall()
-                logger.debug(f"Executed SELECT query: {query[:100]}... with params: {params}")
-                return results
+            with self.acquire() as conn:
+                results = conn.execute(query, params).fetchall()
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Executed SELECT query: %.100s... with params: %r", query, params)
+            return results
+        except sqlite3.Error as e:
+            logger.error("Failed to execute query '%.100s...': %s", query, e)
+            raise DatabaseError(f"Query execution failed: {e}")
+
+    def execute_query_iter(self, query: str, params: tuple = (), chunk_size: int = 1024):
+        """
+        Executes a SELECT query and yields its rows, fetching chunk_size at a time,
+        so large results never sit in memory all at once. The pooled connection is
+        held until the generator is exhausted or closed.
+        :param query: The SQL query string.
+        :param params: A tuple of parameters to bind to the query.
+        :param chunk_size: Rows fetched per round trip.
+        :return: A generator of sqlite3.Row objects.
+        """
+        try:
+            with self.acquire() as conn:
+                cursor = conn.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield from rows
         except sqlite3.Error as e:
-            logger.error(f"Failed to execute query '{query[:100]}...': {e}")
+            logger.error("Failed to execute query '%.100s...': %s", query, e)
             raise DatabaseError(f"Query execution failed: {e}")
 
     def execute_script(self, script: str) -> None:
@@ -149,13 +281,12 @@ class DatabaseManager:
         Executes a SQL script (multiple statements).
         :param script: The SQL script string.
         """
-        conn = self.connect()
         try:
-            with conn:
+            with self.acquire() as conn:
                 conn.executescript(script)
-                logger.info(f"Executed SQL script: {script[:100]}...")
+            logger.info("Executed SQL script: %.100s...", script)
         except sqlite3.Error as e:
-            logger.error(f"Failed to execute script: {e}")
+            logger.error("Failed to execute script: %s", e)
             raise DatabaseError(f"Script execution failed: {e}")
 
     def execute_update(self, query: str, params: tuple = ()) -> int:
@@ -165,16 +296,14 @@ class DatabaseManager:
         :param params: A tuple of parameters to bind to the query.
         :return: The number of rows affected.
         """
-        conn = self.connect()
         try:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute(query, params)
-                rowcount = cursor.rowcount
-                logger.debug(f"Executed UPDATE query: {query[:100]}... with params: {params}. Rows affected: {rowcount}")
-                return rowcount
+            with self.acquire() as conn:
+                rowcount = conn.execute(query, params).rowcount
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Executed UPDATE query: %.100s... with params: %r. Rows affected: %d", query, params, rowcount)
+            return rowcount
         except sqlite3.Error as e:
-            logger.error(f"Failed to execute update query '{query[:100]}...': {e}")
+            logger.error("Failed to execute update query '%.100s...': %s", query, e)
             raise DatabaseError(f"Update query execution failed: {e}")
 
     def execute_insert_get_id(self, query: str, params: tuple = ()) -> int:
@@ -184,38 +313,163 @@ class DatabaseManager:
         :param params: A tuple of parameters to bind to the query.
         :return: The last inserted row ID.
         """
-        conn = self.connect()
         try:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute(query, params)
-                last_id = cursor.lastrowid
-                logger.debug(f"Executed INSERT query: {query[:100]}... with params: {params}. New ID: {last_id}")
-                return last_id
+            with self.acquire() as conn:
+                last_id = conn.execute(query, params).lastrowid
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Executed INSERT query: %.100s... with params: %r. New ID: %s", query, params, last_id)
+            return last_id
         except sqlite3.Error as e:
-            logger.error(f"Failed to execute insert query '{query[:100]}...': {e}")
+            logger.error("Failed to execute insert query '%.100s...': %s", query, e)
             raise DatabaseError(f"Insert query execution failed: {e}")
 
-    def __del__(self):
+    def checkpoint(self) -> None:
         """
-        Destructor to ensure connection is closed.
+        Copies the WAL back into the database file and truncates it.
+        SQLite checkpoints automatically every 1000 pages, but those passive
+        checkpoints can't finish while readers are active; call this from a
+        maintenance job to keep the WAL from growing under steady read load.
+        """
+        try:
+            with self.acquire() as conn:
+                busy, wal_pages, moved = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+            logger.info("WAL checkpoint: busy=%d, wal pages=%d, checkpointed=%d", busy, wal_pages, moved)
+        except sqlite3.Error as e:
+            logger.error("WAL checkpoint failed: %s", e)
+            raise DatabaseError(f"WAL checkpoint failed: {e}")
+
+    @contextmanager
+    def transaction(self):
+        """
+        Runs a block of writes in one BEGIN...COMMIT, rolling back on any error.
+        The calling thread keeps one pooled connection for the whole block, and
+        helper calls made on this manager inside it share that connection,
+        so they join the transaction rather than committing on their own; so do
+        nested transaction() blocks.
+        Timestamps from now() are fixed for the duration of the block.
+        :return: A context manager yielding a cursor.
+        """
+        with self.acquire() as conn:
+            if conn.in_transaction:
+                # Nested: the enclosing transaction() commits or rolls back
+                yield conn.cursor()
+                return
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            self._local.tx_now = utc_now_iso()
+            try:
+                yield cursor
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                self._local.tx_now = None
+            conn.commit()
+
+    def now(self) -> str:
+        """
+        Returns the timestamp to record for a write. Inside transaction() it is
+        taken once, when the outermost block begins, so every row the transaction
+        writes carries the same time; outside one it is the current time.
+        :return: An ISO-8601 UTC timestamp string.
+        """
+        return getattr(self._local, 'tx_now', None) or utc_now_iso()
+
+    def __enter__(self) -> 'DatabaseManager':
+        """
+        Opens the pool for a `with DatabaseManager(path) as db:` block.
+        """
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Closes the pooled connections when the block exits, even on error.
         """
         self.disconnect()
 
 
 # --- Utility Functions ---
 
-def hash_password(password: str) -> str:
+# (second, 'YYYY-MM-DDTHH:MM:SS') for the last second formatted. One tuple, read
+# and replaced in single steps, so threads never pair a second with another's prefix.
+_iso_cache = (-1, '')
+
+def utc_now_iso() -> str:
+    """
+    Returns the current UTC time as an ISO-8601 string with microseconds.
+    The 'YYYY-MM-DDTHH:MM:SS' part is formatted once per second and reused.
+    :return: e.g. '2024-05-01T12:30:45.123456'.
+    """
+    global _iso_cache
+    second, micros = divmod(time.time_ns() // 1000, 1_000_000)
+    cached_second, prefix = _iso_cache
+    if cached_second != second:
+        prefix = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(second))
+        _iso_cache = (second, prefix)
+    return f"{prefix}.{micros:06d}"
+
+_LIKE_ESCAPES = str.maketrans({'\\': '\\\\', '%': '\\%', '_': '\\_'})
+
+def like_contains(term: str) -> str:
+    """
+    Builds a LIKE pattern matching `term` anywhere, for use with ESCAPE '\\'.
+    :param term: The literal text to look for; % and _ in it are not wildcards.
+    :return: The escaped '%term%' pattern.
+    """
+    return f"%{term.translate(_LIKE_ESCAPES)}%"
+
+# Address columns a user may update, in the order they appear in the SET clause
+ADDRESS_UPDATE_FIELDS = ('street_line1', 'street_line2', 'city', 'state', 'postal_code', 'country')
+
+@lru_cache(maxsize=64)
+def address_update_sql(fields: Tuple[str, ...]) -> str:
+    """
+    Builds the UPDATE statement for one combination of address fields.
+    Cached, so each combination is only assembled once.
+    :param fields: Columns to set, in ADDRESS_UPDATE_FIELDS order.
+    :return: The SQL string.
+    """
+    return f"""
+        UPDATE addresses
+        SET {', '.join(f'{field} = ?' for field in fields)}
+        WHERE user_id = ? AND address_id = ?
+        """
+
+_PEPPER = PASSWORD_SALT.encode('utf-8')
+
+def _scrypt(password: str, salt: bytes) -> bytes:
+    return hashlib.scrypt(password.encode('utf-8'), salt=salt + _PEPPER,
+                          n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P, dklen=SCRYPT_DKLEN)
+
+def hash_password(password: str, salt: Optional[bytes] = None) -> str:
     """
-    Hashes a password with a static salt using SHA-256.
+    Hashes a password with scrypt, using a per-user salt plus the app-wide pepper.
     :param password: The plaintext password.
-    :return: The hashed password as a hex digest.
+    :param salt: Salt bytes; a fresh random salt is generated if omitted.
+    :return: The salt and derived key as 'salt_hex:key_hex'.
     """
     if not password or len(password) < MIN_PASSWORD_LENGTH:
         raise ValidationError(f"Password must be at least {MIN_PASSWORD_LENGTH} characters long.")
     
-    salted_password = password + PASSWORD_SALT
-    return hashlib.sha256(salted_password.encode('utf-8')).hexdigest()
+    if salt is None:
+        salt = os.urandom(PASSWORD_SALT_BYTES)
+    return salt.hex() + ':' + _scrypt(password, salt).hex()
+
+def verify_password(password: str, stored_hash: str) -> bool:
+    """
+    Checks a password against a hash produced by hash_password, in constant time.
+    :param password: The plaintext password.
+    :param stored_hash: The stored 'salt_hex:key_hex' value.
+    :return: True if the password matches, False otherwise.
+    """
+    salt_hex, sep, key_hex = stored_hash.partition(':')
+    if not sep:
+        return False
+    candidate = _scrypt(password, bytes.fromhex(salt_hex)).hex()
+    return hmac.compare_digest(candidate, key_hex)
+
+_EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', re.ASCII)
 
 def validate_email(email: str) -> bool:
     """
@@ -223,8 +477,7 @@ def validate_email(email: str) -> bool:
     :param email: The email string to validate.
     :return: True if valid, False otherwise.
     """
-    regex = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(regex, email) is not None
+    return _EMAIL_RE.fullmatch(email) is not None
 
 def generate_api_key() -> str:
     """
@@ -233,21 +486,21 @@ def generate_api_key() -> str:
     """
     return str(uuid.uuid4())
 
-def decimal_to_db(value: Decimal) -> str:
+def decimal_to_db(value: Decimal) -> int:
     """
-    Converts a Decimal to a string for database storage.
+    Converts a Decimal amount to integer cents for database storage.
     :param value: The Decimal value.
-    :return: A string representation.
+    :return: The amount in cents (half-up rounding).
     """
-    return str(value)
+    return int((value * 100).to_integral_value(ROUND_HALF_UP))
 
-def db_to_decimal(value: Union[str, float, int]) -> Decimal:
+def db_to_decimal(value: int) -> Decimal:
     """
-    Converts a database value (str, float, int) to a Decimal.
-    :param value: The value from the database.
+    Converts integer cents from the database to a 2-place Decimal.
+    :param value: The amount in cents.
     :return: A Decimal object.
     """
-    return Decimal(value)
+    return Decimal(value).scaleb(-2)
 
 
 # --- User Service Class ---
@@ -257,12 +510,23 @@ class UserService:
     Manages user registration, authentication, and profile data.
     """
 
+    # Public user columns; password_hash is only read where it is checked
+    USER_COLUMNS = "user_id, email, first_name, last_name, role, created_at"
+
+    Address = namedtuple('Address', [
+        'address_id', 'street_line1', 'street_line2', 'city', 'state', 'postal_code', 'country',
+        'is_default_shipping', 'is_default_billing'
+    ])
+
     def __init__(self, db_manager: DatabaseManager):
         """
         Initializes the user service.
         :param db_manager: An instance of DatabaseManager.
         """
         self.db = db_manager
+        # LRU of user_id -> (expires_at, role) for permission checks
+        self._role_cache: OrderedDict = OrderedDict()
+        self._role_cache_lock = threading.Lock()
         logger.info("UserService initialized.")
 
     def register_user(self, email: str, password: str, first_name: str, last_name: str) -> int:
@@ -276,13 +540,9 @@ class UserService:
         """
         if not validate_email(email):
             raise ValidationError("Invalid email format.")
-        
-        # Check for existing user
-        if self.find_user_by_email(email):
-            raise ValidationError("Email already registered.")
             
         hashed_pass = hash_password(password)
-        created_at = datetime.datetime.utcnow().isoformat()
+        created_at = self.db.now()
         
         sql = """
         INSERT INTO users (email, password_hash, first_name, last_name, role, created_at, last_login)
@@ -290,17 +550,25 @@ class UserService:
         """
         
         try:
-            user_id = self.db.execute_insert_get_id(sql, (
-                email, hashed_pass, first_name, last_name, ROLE_CUSTOMER, created_at, created_at
-            ))
+            with self.db.transaction() as cursor:
+                cursor.execute(sql, (
+                    email, hashed_pass, first_name, last_name, ROLE_CUSTOMER, created_at, created_at
+                ))
+                user_id = cursor.lastrowid
+                
+                # Create a default shipping address entry, committed together with the user
+                self.create_default_address(user_id)
             logger.info(f"New user registered with ID: {user_id} and email: {email}")
-            
-            # Create a default shipping address entry
-            self.create_default_address(user_id)
             return user_id
-        except DatabaseError as e:
+        except sqlite3.IntegrityError as e:
+            # Email uniqueness is enforced by the UNIQUE constraint, not a lookup beforehand
+            if 'users.email' in str(e):
+                raise ValidationError("Email already registered.")
+            logger.error(f"Failed to register user {email}: {e}")
+            raise DatabaseError(f"User registration failed: {e}")
+        except sqlite3.Error as e:
             logger.error(f"Failed to register user {email}: {e}")
-            raise
+            raise DatabaseError(f"User registration failed: {e}")
 
     def create_default_address(self, user_id: int):
         """
@@ -325,13 +593,14 @@ class UserService:
         :param password: User's plaintext password.
         :return: A dictionary of user data if successful.
         """
-        user = self.find_user_by_email(email)
-        if not user:
+        sql = f"SELECT {self.USER_COLUMNS}, password_hash FROM users WHERE email = ? LIMIT 1"
+        results = self.db.execute_query(sql, (email,))
+        if not results:
             logger.warning(f"Auth failed: No user found for email {email}")
             raise AuthenticationError("Invalid email or password.")
+        user = results[0]
             
-        hashed_pass = hash_password(password)
-        if user['password_hash'] != hashed_pass:
+        if not verify_password(password, user['password_hash']):
             logger.warning(f"Auth failed: Incorrect password for email {email}")
             raise AuthenticationError("Invalid email or password.")
             
@@ -339,7 +608,10 @@ class UserService:
         self.update_last_login(user['user_id'])
         
         logger.info(f"User authenticated successfully: {email}")
-        return dict(user)
+        # The hash was only needed for the check; don't hand it to callers
+        user_data = dict(user)
+        del user_data['password_hash']
+        return user_data
 
     def find_user_by_email(self, email: str) -> Optional[sqlite3.Row]:
         """
@@ -347,7 +619,7 @@ class UserService:
         :param email: The email to search for.
         :return: A sqlite3.Row object or None if not found.
         """
-        sql = "SELECT * FROM users WHERE email = ? LIMIT 1"
+        sql = f"SELECT {self.USER_COLUMNS} FROM users WHERE email = ? LIMIT 1"
         results = self.db.execute_query(sql, (email,))
         return results[0] if results else None
 
@@ -357,16 +629,48 @@ class UserService:
         :param user_id: The ID to search for.
         :return: A sqlite3.Row object or None if not found.
         """
-        sql = "SELECT * FROM users WHERE user_id = ? LIMIT 1"
+        sql = f"SELECT {self.USER_COLUMNS} FROM users WHERE user_id = ? LIMIT 1"
         results = self.db.execute_query(sql, (user_id,))
         return results[0] if results else None
 
+    def get_user_role(self, user_id: int) -> Optional[str]:
+        """
+        Looks up only a user's role, for permission checks.
+        Roles are cached for ROLE_CACHE_TTL_SECONDS; change_user_role evicts the entry.
+        :param user_id: The user's ID.
+        :return: The role, or None if the user does not exist.
+        """
+        with self._role_cache_lock:
+            cached = self._role_cache.get(user_id)
+            if cached is not None and cached[0] > time.monotonic():
+                self._role_cache.move_to_end(user_id)
+                return cached[1]
+        
+        results = self.db.execute_query("SELECT role FROM users WHERE user_id = ?", (user_id,))
+        if not results:
+            return None
+        role = results[0][0]
+        with self._role_cache_lock:
+            self._role_cache[user_id] = (time.monotonic() + ROLE_CACHE_TTL_SECONDS, role)
+            self._role_cache.move_to_end(user_id)
+            if len(self._role_cache) > ROLE_CACHE_SIZE:
+                self._role_cache.popitem(last=False)
+        return role
+
+    def forget_role(self, user_id: int):
+        """
+        Drops a user's cached role, after it was changed outside change_user_role.
+        :param user_id: The user's ID.
+        """
+        with self._role_cache_lock:
+            self._role_cache.pop(user_id, None)
+
     def update_last_login(self, user_id: int):
         """
         Updates the last_login timestamp for a user.
         :param user_id: The user's ID.
         """
-        now = datetime.datetime.utcnow().isoformat()
+        now = self.db.now()
         sql = "UPDATE users SET last_login = ? WHERE user_id = ?"
         try:
             self.db.execute_update(sql, (now, user_id))
@@ -378,32 +682,56 @@ class UserService:
         """
         Retrieves a user's profile and their associated addresses.
         :param user_id: The user's ID.
-        :return: A dictionary containing user info and a list of addresses.
+        :return: A dictionary containing user info and a list of Address tuples.
         """
-        user_sql = """
-        SELECT user_id, email, first_name, last_name, role, created_at 
-        FROM users 
-        WHERE user_id = ?
-        """
-        address_sql = """
-        SELECT address_id, street_line1, street_line2, city, state, postal_code, country, is_default_shipping, is_default_billing
-        FROM addresses
-        WHERE user_id = ?
-        ORDER BY is_default_shipping DESC, address_id
+        # One row per address (or a single row with NULL address columns)
+        sql = """
+        SELECT 
+            u.user_id, u.email, u.first_name, u.last_name, u.role, u.created_at,
+            a.address_id, a.street_line1, a.street_line2, a.city, a.state, a.postal_code, a.country,
+            a.is_default_shipping, a.is_default_billing
+        FROM users u
+        LEFT JOIN addresses a ON a.user_id = u.user_id
+        WHERE u.user_id = ?
+        ORDER BY a.is_default_shipping DESC, a.address_id
         """
         
-        user_results = self.db.execute_query(user_sql, (user_id,))
-        if not user_results:
+        results = self.db.execute_query(sql, (user_id,))
+        if not results:
             raise ValidationError(f"User not found with ID: {user_id}")
-            
-        address_results = self.db.execute_query(address_sql, (user_id,))
         
+        keys = results[0].keys()
+        split = keys.index('address_id')
         profile = {
-            "user_info": dict(user_results[0]),
-            "addresses": [dict(row) for row in address_results]
+            "user_info": {key: results[0][key] for key in keys[:split]},
+            "addresses": [
+                self.Address(*row[split:])
+                for row in results if row['address_id'] is not None
+            ]
         }
         return profile
 
+    def owns_addresses(self, user_id: int, *address_ids: int) -> bool:
+        """
+        Checks that every given address belongs to the user, without loading the profile.
+        :param user_id: The user's ID.
+        :param address_ids: The address IDs to check (duplicates are fine).
+        :return: True if the user owns all of them, False otherwise.
+        """
+        wanted = set(address_ids)
+        marks = ", ".join(["?"] * len(wanted))
+        # The LEFT JOIN keeps one row for an existing user even when no address matches
+        sql = f"""
+        SELECT a.address_id
+        FROM users u
+        LEFT JOIN addresses a ON a.user_id = u.user_id AND a.address_id IN ({marks})
+        WHERE u.user_id = ?
+        """
+        results = self.db.execute_query(sql, (*wanted, user_id))
+        if not results:
+            raise ValidationError(f"User not found with ID: {user_id}")
+        return {row['address_id'] for row in results} >= wanted
+
     def update_user_address(self, user_id: int, address_id: int, address_data: Dict[str, Any]) -> int:
         """
         Updates a specific address for a user.
@@ -412,27 +740,16 @@ class UserService:
         :param address_data: A dict with new address fields.
         :return: Number of rows-affected.
         """
-        allowed_fields = ['street_line1', 'street_line2', 'city', 'state', 'postal_code', 'country']
-        updates = []
-        params = []
-        
-        for key, value in address_data.items():
-            if key in allowed_fields:
-                updates.append(f"{key} = ?")
-                params.append(value)
+        # Canonical field order, so the same fieldset always maps to the same SQL
+        fields = tuple(field for field in ADDRESS_UPDATE_FIELDS if field in address_data)
         
-        if not updates:
+        if not fields:
             raise ValidationError("No valid address fields provided for update.")
             
+        params = [address_data[field] for field in fields]
         params.extend([user_id, address_id])
         
-        sql = f"""
-        UPDATE addresses
-        SET {', '.join(updates)}
-        WHERE user_id = ? AND address_id = ?
-        """
-        
-        return self.db.execute_update(sql, tuple(params))
+        return self.db.execute_update(address_update_sql(fields), tuple(params))
 
     def change_user_role(self, target_user_id: int, new_role: str, admin_user_id: int) -> bool:
         """
@@ -442,8 +759,7 @@ class UserService:
         :param admin_user_id: The ID of the user performing the action (must be ADMIN).
         :return: True on success.
         """
-        admin = self.find_user_by_id(admin_user_id)
-        if not admin or admin['role'] != ROLE_ADMIN:
+        if self.get_user_role(admin_user_id) != ROLE_ADMIN:
             logger.error(f"Permission denied: User {admin_user_id} attempted to change role for {target_user_id}")
             raise AuthenticationError("You do not have permission to perform this action.")
             
@@ -458,6 +774,7 @@ class UserService:
         
         if rows_affected == 0:
             raise ValidationError(f"Target user {target_user_id} not found.")
+        self.forget_role(target_user_id)
             
         logger.info(f"Admin {admin_user_id} changed role for user {target_user_id} to {new_role}")
         return True
@@ -470,12 +787,26 @@ class ProductService:
     Manages product catalog, categories, reviews, and inventory levels.
     """
 
+    SearchResult = namedtuple('SearchResult', [
+        'product_id', 'name', 'price', 'sku', 'category_name', 'stock_quantity', 'average_rating'
+    ])
+
+    # Columns order validation needs; shared by the cache warm-up and lookups
+    STOCK_AND_PRICE_SQL = """
+        SELECT p.product_id, p.name, p.sku, p.price, i.quantity as stock_quantity
+        FROM products p
+        JOIN inventory i ON p.product_id = i.product_id
+        """
+
     def __init__(self, db_manager: DatabaseManager):
         """
         Initializes the product service.
         :param db_manager: An instance of DatabaseManager.
         """
         self.db = db_manager
+        # product_id -> (expires_at, row), in LRU order
+        self._product_cache: OrderedDict = OrderedDict()
+        self._product_cache_lock = threading.Lock()
         logger.info("ProductService initialized.")
 
     def add_product_category(self, name: str, description: str, parent_category_id: Optional[int] = None) -> int:
@@ -503,16 +834,11 @@ class ProductService:
         :param sku: Stock Keeping Unit (must be unique).
         :return: The new product ID.
         """
-        if price <= Decimal('0.00'):
+        db_price = decimal_to_db(price)
+        if db_price <= 0:
             raise ValidationError("Price must be positive.")
         if stock_quantity < 0:
             raise ValidationError("Stock quantity cannot be negative.")
-            
-        # Check for unique SKU
-        if self.get_product_by_sku(sku):
-            raise ValidationError(f"SKU '{sku}' already exists.")
-            
-        db_price = decimal_to_db(price)
         
         product_sql = """
         INSERT INTO products (name, description, price, category_id, sku, created_at)
@@ -523,11 +849,9 @@ class ProductService:
         VALUES (?, ?, ?)
         """
         
-        conn = self.db.connect()
         try:
-            with conn:
-                cursor = conn.cursor()
-                now = datetime.datetime.utcnow().isoformat()
+            with self.db.transaction() as cursor:
+                now = self.db.now()
                 
                 # Insert product
                 cursor.execute(product_sql, (name, description, db_price, category_id, sku, now))
@@ -542,10 +866,77 @@ class ProductService:
                 logger.info(f"Added new product {name} (ID: {product_id}, SKU: {sku}) with stock {stock_quantity}")
                 return product_id
                 
+        except sqlite3.IntegrityError as e:
+            # SKU uniqueness is enforced by the UNIQUE constraint, not a lookup beforehand
+            if 'products.sku' in str(e):
+                raise ValidationError(f"SKU '{sku}' already exists.")
+            logger.error(f"Failed to add product {name}: {e}")
+            raise DatabaseError(f"Product creation failed: {e}")
         except sqlite3.Error as e:
             logger.error(f"Failed to add product {name}: {e}")
             raise DatabaseError(f"Product creation failed: {e}")
 
+    def add_products_bulk(self, products: List[Dict[str, Any]]) -> List[int]:
+        """
+        Adds many products in one transaction, with multi-row INSERTs for the
+        products and one executemany for their inventory rows. All or nothing.
+        :param products: Dictionaries with the add_product arguments as keys
+                         (name, description, price, category_id, stock_quantity, sku).
+        :return: The new product IDs, in input order.
+        """
+        rows = []
+        for product in products:
+            db_price = decimal_to_db(product['price'])
+            if db_price <= 0:
+                raise ValidationError(f"Price must be positive (SKU '{product['sku']}').")
+            if product['stock_quantity'] < 0:
+                raise ValidationError(f"Stock quantity cannot be negative (SKU '{product['sku']}').")
+            rows.append((product['name'], product['description'], db_price, product['category_id'], product['sku']))
+        
+        skus = [row[4] for row in rows]
+        if len(set(skus)) != len(skus):
+            raise ValidationError("Duplicate SKUs in product batch.")
+        
+        inventory_sql = """
+        INSERT INTO inventory (product_id, quantity, last_updated)
+        VALUES (?, ?, ?)
+        """
+        
+        try:
+            with self.db.transaction() as cursor:
+                now = self.db.now()
+                ids_by_sku: Dict[str, int] = {}
+                
+                for start in range(0, len(rows), BULK_INSERT_ROWS):
+                    chunk = rows[start:start + BULK_INSERT_ROWS]
+                    values = ", ".join(["(?, ?, ?, ?, ?, ?)"] * len(chunk))
+                    # RETURNING rows come back in no guaranteed order, so match them by SKU
+                    product_sql = f"""
+                    INSERT INTO products (name, description, price, category_id, sku, created_at)
+                    VALUES {values}
+                    RETURNING sku, product_id
+                    """
+                    params = [value for row in chunk for value in (*row, now)]
+                    ids_by_sku.update(cursor.execute(product_sql, params).fetchall())
+                
+                product_ids = [ids_by_sku[sku] for sku in skus]
+                cursor.executemany(inventory_sql, [
+                    (product_id, product['stock_quantity'], now)
+                    for product_id, product in zip(product_ids, products)
+                ])
+                
+        except sqlite3.IntegrityError as e:
+            if 'products.sku' in str(e):
+                raise ValidationError("One or more SKUs in the batch already exist.")
+            logger.error(f"Failed to add {len(rows)} products: {e}")
+            raise DatabaseError(f"Bulk product creation failed: {e}")
+        except sqlite3.Error as e:
+            logger.error(f"Failed to add {len(rows)} products: {e}")
+            raise DatabaseError(f"Bulk product creation failed: {e}")
+        
+        logger.info(f"Added {len(product_ids)} products in one batch.")
+        return product_ids
+
     def get_product_by_id(self, product_id: int) -> Optional[Dict[str, Any]]:
         """
         Retrieves a single product and its inventory level by ID.
@@ -567,9 +958,73 @@ class ProductService:
             return None
             
         product = dict(result[0])
+        product['price_cents'] = product['price']
         product['price'] = db_to_decimal(product['price'])
         return product
 
+    def get_stock_and_prices(self, product_ids: List[int]) -> Dict[int, sqlite3.Row]:
+        """
+        Fetches what order validation needs for many products: cached rows where
+        fresh, and one query for the rest. Cached stock may lag by up to
+        PRODUCT_CACHE_TTL_SECONDS; update_stock_bulk re-checks it when taking stock.
+        :param product_ids: The product IDs; duplicates are fine.
+        :return: A dictionary of product_id -> row (product_id, name, sku, price in cents,
+                 stock_quantity). Unknown IDs are absent.
+        """
+        now = time.monotonic()
+        found: Dict[int, sqlite3.Row] = {}
+        missing = []
+        with self._product_cache_lock:
+            for product_id in dict.fromkeys(product_ids):
+                cached = self._product_cache.get(product_id)
+                if cached is not None and cached[0] > now:
+                    self._product_cache.move_to_end(product_id)
+                    found[product_id] = cached[1]
+                else:
+                    missing.append(product_id)
+        
+        if missing:
+            marks = ", ".join(["?"] * len(missing))
+            sql = self.STOCK_AND_PRICE_SQL + f" WHERE p.product_id IN ({marks})"
+            rows = self.db.execute_query(sql, tuple(missing))
+            self._cache_products(rows)
+            found.update((row['product_id'], row) for row in rows)
+        return found
+
+    def prewarm_product_cache(self, limit: int = PRODUCT_PREWARM_COUNT) -> int:
+        """
+        Loads the best-selling products into the product cache in one query.
+        :param limit: How many products to load.
+        :return: The number of products cached.
+        """
+        sql = self.STOCK_AND_PRICE_SQL + """
+        JOIN product_sales_agg s ON s.product_id = p.product_id
+        ORDER BY s.total_quantity_sold DESC
+        LIMIT ?
+        """
+        rows = self.db.execute_query(sql, (limit,))
+        self._cache_products(rows)
+        logger.info(f"Prewarmed product cache with {len(rows)} products.")
+        return len(rows)
+
+    def _cache_products(self, rows: List[sqlite3.Row]):
+        expires_at = time.monotonic() + PRODUCT_CACHE_TTL_SECONDS
+        with self._product_cache_lock:
+            for row in rows:
+                self._product_cache[row['product_id']] = (expires_at, row)
+                self._product_cache.move_to_end(row['product_id'])
+            while len(self._product_cache) > PRODUCT_CACHE_SIZE:
+                self._product_cache.popitem(last=False)
+
+    def forget_products(self, product_ids: Iterable[int]):
+        """
+        Drops cached rows for products whose stock just changed.
+        :param product_ids: The product IDs to forget.
+        """
+        with self._product_cache_lock:
+            for product_id in product_ids:
+                self._product_cache.pop(product_id, None)
+
     def get_product_by_sku(self, sku: str) -> Optional[Dict[str, Any]]:
         """
         Retrieves a single product and its inventory level by SKU.
@@ -591,6 +1046,7 @@ class ProductService:
             return None
             
         product = dict(result[0])
+        product['price_cents'] = product['price']
         product['price'] = db_to_decimal(product['price'])
         return product
 
@@ -602,7 +1058,7 @@ class ProductService:
         :param quantity_change: The amount to add/subtract (e.g., -2 to subtract 2).
         :return: The new stock level.
         """
-        now = datetime.datetime.utcnow().isoformat()
+        now = self.db.now()
         
         # This SQL ensures we don't go below zero
         sql = """
@@ -611,12 +1067,14 @@ class ProductService:
             quantity = quantity + ?,
             last_updated = ?
         WHERE product_id = ? AND (quantity + ?) >= 0
+        RETURNING quantity
         """
         
         params = (quantity_change, now, product_id, quantity_change)
-        rows_affected = self.db.execute_update(sql, params)
+        updated = self.db.execute_query(sql, params)
+        self.forget_products((product_id,))
         
-        if rows_affected == 0:
+        if not updated:
             # Check current stock to see why it failed
             current_stock = self.get_stock_level(product_id)
             if current_stock is None:
@@ -626,10 +1084,62 @@ class ProductService:
                 raise InventoryError(f"Insufficient stock for product ID {product_id}. Available: {current_stock}, Requested: {abs(quantity_change)}")
             raise DatabaseError("Failed to update stock, unknown reason.")
 
-        new_stock = self.get_stock_level(product_id)
+        new_stock = updated[0]['quantity']
         logger.info(f"Updated stock for product_id {product_id} by {quantity_change}. New stock: {new_stock}")
         return new_stock
 
+    def update_stock_bulk(self, items: List[Tuple[int, int]]) -> Dict[int, int]:
+        """
+        Takes stock for many products in a single UPDATE. Either every product
+        has enough stock and all are decremented, or none are.
+        :param items: (product_id, quantity) pairs; repeated product IDs are summed.
+        :return: A dictionary of product_id -> new stock level.
+        """
+        totals: Dict[int, int] = {}
+        for product_id, quantity in items:
+            totals[product_id] = totals.get(product_id, 0) + quantity
+        
+        now = self.db.now()
+        values = ", ".join(["(?, ?)"] * len(totals))
+        sql = f"""
+        WITH ordered (product_id, quantity) AS (VALUES {values})
+        UPDATE inventory
+        SET 
+            quantity = inventory.quantity - ordered.quantity,
+            last_updated = ?
+        FROM ordered
+        WHERE inventory.product_id = ordered.product_id AND inventory.quantity >= ordered.quantity
+        RETURNING inventory.product_id, inventory.quantity
+        """
+        params = [value for pair in totals.items() for value in pair]
+        params.append(now)
+        
+        try:
+            with self.db.transaction() as cursor:
+                new_levels = dict(cursor.execute(sql, params).fetchall())
+                self.forget_products(totals)
+                short = [pid for pid in totals if pid not in new_levels]
+                if short:
+                    # One lookup for the failed rows only, to say what was available.
+                    # Rows already decremented by the UPDATE above are not in `short`.
+                    marks = ", ".join(["?"] * len(short))
+                    available = dict(cursor.execute(
+                        f"SELECT product_id, quantity FROM inventory WHERE product_id IN ({marks})", short
+                    ).fetchall())
+                    details = "; ".join(
+                        f"ID {pid}: requested {totals[pid]}, available {available.get(pid, 'none')}"
+                        for pid in short
+                    )
+                    logger.error(f"InventoryError: bulk stock update short for {details}")
+                    # Raising rolls back the partial decrement
+                    raise InventoryError(f"Insufficient stock for product ID(s) {short} ({details}).")
+        except sqlite3.Error as e:
+            logger.error(f"Failed bulk stock update for {len(totals)} products: {e}")
+            raise DatabaseError(f"Bulk stock update failed: {e}")
+        
+        logger.info(f"Took stock for {len(totals)} products in one update.")
+        return new_levels
+
     def get_stock_level(self, product_id: int) -> Optional[int]:
         """
         Gets the current stock level for a single product.
@@ -640,7 +1150,7 @@ class ProductService:
         result = self.db.execute_query(sql, (product_id,))
         return result[0]['quantity'] if result else None
 
-    def search_products(self, search_term: str, category_id: Optional[int] = None, min_price: Optional[Decimal] = None, max_price: Optional[Decimal] = None, limit: int = 20) -> List[Dict[str, Any]]:
+    def search_products(self, search_term: str, category_id: Optional[int] = None, min_price: Optional[Decimal] = None, max_price: Optional[Decimal] = None, limit: int = 20) -> List['ProductService.SearchResult']:
         """
         Performs a complex search for products.
         :param search_term: Text to search in name and description.
@@ -648,7 +1158,7 @@ class ProductService:
         :param min_price: Optional minimum price.
         :param max_price: Optional maximum price.
         :param limit: Max number of results.
-        :return: A list of product dictionaries.
+        :return: A list of SearchResult tuples.
         """
         
         # This query is complex and interdependent on multiple tables
@@ -662,10 +1172,17 @@ class ProductService:
         JOIN categories c ON p.category_id = c.category_id
         JOIN inventory i ON p.product_id = i.product_id
         LEFT JOIN reviews r ON p.product_id = r.product_id
-        WHERE (p.name LIKE ? OR p.description LIKE ?)
         """
         
-        params = [f'%{search_term}%', f'%{search_term}%']
+        if len(search_term) >= 3:
+            # Quoted as a single FTS phrase, so user input can't inject query syntax
+            sql_base += " WHERE p.product_id IN (SELECT rowid FROM products_fts WHERE products_fts MATCH ?) "
+            params = ['"' + search_term.replace('"', '""') + '"']
+        else:
+            # Trigrams can't match terms shorter than 3 characters. One LIKE over
+            # both fields; the newline keeps a match from spanning name and description.
+            sql_base += " WHERE (p.name || char(10) || COALESCE(p.description, '')) LIKE ? ESCAPE '\\' "
+            params = [like_contains(search_term)]
         
         if category_id is not None:
             sql_base += " AND p.category_id = ? "
@@ -690,14 +1207,11 @@ class ProductService:
         
         results = self.db.execute_query(full_sql, tuple(params))
         
-        # Convert price back to Decimal
-        products = []
-        for row in results:
-            product = dict(row)
-            product['price'] = db_to_decimal(product['price'])
-            products.append(product)
-            
-        return products
+        # Built positionally (column order matches SearchResult), converting price back to Decimal
+        return [
+            self.SearchResult(row[0], row[1], db_to_decimal(row[2]), *row[3:])
+            for row in results
+        ]
 
     def add_product_review(self, user_id: int, product_id: int, rating: int, review_text: str) -> int:
         """
@@ -721,13 +1235,20 @@ class ProductService:
         INSERT INTO reviews (product_id, user_id, rating, review_text, created_at)
         VALUES (?, ?, ?, ?, ?)
         """
-        now = datetime.datetime.utcnow().isoformat()
-        review_id = self.db.execute_insert_get_id(sql, (product_id, user_id, rating, review_text, now))
+        now = self.db.now()
+        try:
+            with self.db.transaction() as cursor:
+                cursor.execute(sql, (product_id, user_id, rating, review_text, now))
+                review_id = cursor.lastrowid
+                
+                # This is interdependent: we immediately update the product's average rating,
+                # in the same transaction as the review
+                self.update_product_average_rating(product_id)
+        except sqlite3.Error as e:
+            logger.error(f"Failed to add review for product {product_id}: {e}")
+            raise DatabaseError(f"Review creation failed: {e}")
         logger.info(f"User {user_id} added review {review_id} for product {product_id} with rating {rating}")
         
-        # This is interdependent: we immediately update the product's average rating
-        self.update_product_average_rating(product_id)
-        
         return review_id
 
     def update_product_average_rating(self, product_id: int):
@@ -737,26 +1258,18 @@ class ProductService:
         :param product_id: The product to update.
         """
         
-        # This SQL calculates the average from the reviews table
-        avg_sql = """
-        SELECT AVG(rating) as avg_rating
-        FROM reviews
-        WHERE product_id = ?
-        """
-        
-        result = self.db.execute_query(avg_sql, (product_id,))
-        avg_rating = result[0]['avg_rating'] if result and result[0]['avg_rating'] is not None else 0.0
-        
-        # This SQL updates the products table
+        # The average is computed and written by SQLite in one statement
         update_sql = """
         UPDATE products
-        SET average_rating = ?
+        SET average_rating = COALESCE(
+            (SELECT ROUND(AVG(rating), 2) FROM reviews WHERE product_id = ?), 0.0
+        )
         WHERE product_id = ?
         """
         
         try:
-            self.db.execute_update(update_sql, (round(avg_rating, 2), product_id))
-            logger.info(f"Updated average rating for product {product_id} to {avg_rating:.2f}")
+            self.db.execute_update(update_sql, (product_id, product_id))
+            logger.info(f"Updated average rating for product {product_id}")
         except DatabaseError as e:
             logger.error(f"Failed to update average rating for product {product_id}: {e}")
             # Non-fatal, don't crash the review submission
@@ -771,17 +1284,23 @@ class OrderService:
     """
 
     CartItem = namedtuple('CartItem', ['product_id', 'quantity'])
+    ValidatedItem = namedtuple('ValidatedItem', ['product_id', 'quantity', 'price_at_purchase'])
 
-    def __init__(self, db_manager: DatabaseManager, user_service: UserService, product_service: ProductService):
+    def __init__(self, db_manager: DatabaseManager, user_service: UserService, product_service: ProductService,
+                 reporting_service: Optional['ReportingService'] = None):
         """
         Initializes the order service.
         :param db_manager: An instance of DatabaseManager.
         :param user_service: An instance of UserService.
         :param product_service: An instance of ProductService.
+        :param reporting_service: Optional. Its cached inventory report is dropped whenever stock moves.
         """
         self.db = db_manager
         self.users = user_service
         self.products = product_service
+        self.reports = reporting_service
+        # Most carts draw from the same popular products; load them up front
+        self.products.prewarm_product_cache()
         logger.info("OrderService initialized.")
 
     def create_order(self, user_id: int, cart: List[CartItem], shipping_address_id: int, billing_address_id: int, shipping_method: str = 'STANDARD') -> int:
@@ -804,9 +1323,7 @@ class OrderService:
         
         # Validate user and addresses
         try:
-            user_profile = self.users.get_user_profile(user_id)
-            user_addresses = {addr['address_id'] for addr in user_profile['addresses']}
-            if shipping_address_id not in user_addresses or billing_address_id not in user_addresses:
+            if not self.users.owns_addresses(user_id, shipping_address_id, billing_address_id):
                 raise OrderProcessingError("Invalid shipping or billing address ID for this user.")
         except ValidationError as e:
             raise OrderProcessingError(f"Invalid user: {e}")
@@ -814,11 +1331,13 @@ class OrderService:
         # --- 2. Pricing and Stock Check Phase ---
         
         # This block is highly interdependent on ProductService
-        subtotal = Decimal('0.00')
+        subtotal = 0  # cents
         validated_items = []
+        # One query for every product in the cart; the loop below is lookups only
+        products = self.products.get_stock_and_prices([item.product_id for item in cart])
         
         for item in cart:
-            product = self.products.get_product_by_id(item.product_id)
+            product = products.get(item.product_id)
             if not product:
                 raise OrderProcessingError(f"Product ID {item.product_id} not found.")
                 
@@ -831,36 +1350,32 @@ class OrderService:
                 raise InventoryError(f"Insufficient stock for '{product['name']}'. Requested: {item.quantity}, Available: {current_stock}")
                 
             item_price = product['price']
-            line_total = item_price * Decimal(item.quantity)
+            line_total = item_price * item.quantity
             subtotal += line_total
             
-            validated_items.append({
-                'product_id': item.product_id,
-                'quantity': item.quantity,
-                'price_at_purchase': item_price  # Lock in the price
-            })
+            # Lock in the price
+            validated_items.append(self.ValidatedItem(item.product_id, item.quantity, item_price))
             
         # --- 3. Calculate Final Total ---
         
         shipping_fee = self.calculate_shipping(subtotal, shipping_method)
         total_amount = subtotal + shipping_fee
+        total_items = sum(item.quantity for item in validated_items)
         
         # --- 4. Database Transaction Phase ---
         
-        conn = self.db.connect()
         try:
-            with conn:
-                cursor = conn.cursor()
-                now = datetime.datetime.utcnow().isoformat()
+            with self.db.transaction() as cursor:
+                now = self.db.now()
                 
                 # Step 4a: Create the main order record
                 order_sql = """
-                INSERT INTO orders (user_id, status, total_amount, subtotal, shipping_fee, shipping_address_id, billing_address_id, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                INSERT INTO orders (user_id, status, total_amount, subtotal, shipping_fee, total_items, shipping_address_id, billing_address_id, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """
                 cursor.execute(order_sql, (
-                    user_id, STATUS_PENDING, decimal_to_db(total_amount), decimal_to_db(subtotal),
-                    decimal_to_db(shipping_fee), shipping_address_id, billing_address_id, now
+                    user_id, STATUS_PENDING, total_amount, subtotal,
+                    shipping_fee, total_items, shipping_address_id, billing_address_id, now
                 ))
                 order_id = cursor.lastrowid
                 if not order_id:
@@ -868,41 +1383,24 @@ class OrderService:
                     
                 logger.info(f"Created order {order_id} for user {user_id}. Status: PENDING.")
                 
-                # Step 4b: Insert all order items
-                items_sql = """
+                # Step 4b: Insert all order items in one multi-row INSERT.
+                # MAX_ORDER_ITEMS keeps the bound parameters well under SQLite's limit.
+                values = ", ".join(["(?, ?, ?, ?)"] * len(validated_items))
+                items_sql = f"""
                 INSERT INTO order_items (order_id, product_id, quantity, price_at_purchase)
-                VALUES (?, ?, ?, ?)
+                VALUES {values}
                 """
-                item_data_tuples = [
-                    (order_id, item['product_id'], item['quantity'], decimal_to_db(item['price_at_purchase']))
-                    for item in validated_items
-                ]
-                cursor.executemany(items_sql, item_data_tuples)
+                item_params = [value for item in validated_items for value in (order_id, *item)]
+                cursor.execute(items_sql, item_params)
                 
                 # Step 4c: Update inventory (interdependent call)
-                # We do this inside the same transaction
-                # We need to use the *ProductService* but on the *current* connection/cursor
-                # This is tricky. A better design would have ProductService accept a cursor.
-                # For this sim, we'll just re-implement the stock update logic here.
-                
+                # ProductService shares our connection, so its update joins this
+                # transaction. Stock was checked in phase 2; if it changed since,
+                # this raises and the whole order rolls back.
                 logger.info(f"Updating inventory for {len(validated_items)} items in order {order_id}")
-                inventory_update_sql = """
-                UPDATE inventory
-                SET 
-                    quantity = quantity - ?,
-                    last_updated = ?
-                WHERE product_id = ? AND (quantity - ?) >= 0
-                """
-                for item in validated_items:
-                    rows_affected = cursor.execute(inventory_update_sql, (
-                        item['quantity'], now, item['product_id'], item['quantity']
-                    )).rowcount
-                    
-                    if rows_affected == 0:
-                        # This should have been caught in phase 2, but this is a final check
-                        # If it fails here, the transaction rolls back.
-                        product = self.products.get_product_by_id(item['product_id'])
-                        raise InventoryError(f"Failed to reserve stock for '{product['name']}'. Stock may have changed. Please try again.")
+                self.products.update_stock_bulk([
+                    (item.product_id, item.quantity) for item in validated_items
+                ])
 
                 # Step 4d: Add an entry to order_status_history
                 history_sql = """
@@ -912,7 +1410,9 @@ class OrderService:
                 cursor.execute(history_sql, (order_id, STATUS_PENDING, now))
             
             # Transaction commits here
-            logger.info(f"Successfully created and reserved stock for order {order_id}. Total: {total_amount}")
+            if self.reports:
+                self.reports.forget_reports('get_inventory_stock_report')
+            logger.info(f"Successfully created and reserved stock for order {order_id}. Total: {db_to_decimal(total_amount)}")
             return order_id
             
         except (sqlite3.Error, InventoryError, DatabaseError) as e:
@@ -922,20 +1422,14 @@ class OrderService:
                 raise  # Re-raise the specific error
             raise OrderProcessingError(f"Order creation failed due to a database error: {e}")
 
-    def calculate_shipping(self, subtotal: Decimal, method: str) -> Decimal:
+    def calculate_shipping(self, subtotal: int, method: str) -> int:
         """
         Calculates shipping fee based on subtotal and method.
-        :param subtotal: The order subtotal.
+        :param subtotal: The order subtotal, in cents.
         :param method: 'STANDARD' or 'EXPRESS'.
-        :return: The shipping fee.
+        :return: The shipping fee, in cents.
         """
-        if subtotal >= FREE_SHIPPING_THRESHOLD and method == 'STANDARD':
-            return Decimal('0.00')
-            
-        if method == 'EXPRESS':
-            return SHIPPING_FEE_EXPRESS
-            
-        return SHIPPING_FEE_STANDARD
+        return SHIPPING_FEES.get((method, subtotal >= FREE_SHIPPING_THRESHOLD), SHIPPING_FEE_STANDARD)
 
     def update_order_status(self, order_id: int, new_status: str, admin_user_id: Optional[int] = None) -> bool:
         """
@@ -949,45 +1443,47 @@ class OrderService:
             raise ValidationError(f"Invalid order status: {new_status}")
             
         if admin_user_id:
-            admin = self.users.find_user_by_id(admin_user_id)
-            if not admin or admin['role'] not in (ROLE_ADMIN, ROLE_SUPPORT):
+            if self.users.get_user_role(admin_user_id) not in (ROLE_ADMIN, ROLE_SUPPORT):
                 raise AuthenticationError("You do not have permission to update order status.")
         
-        # Get current status
-        current_status_res = self.db.execute_query("SELECT status FROM orders WHERE order_id = ?", (order_id,))
-        if not current_status_res:
-            raise OrderProcessingError(f"Order ID {order_id} not found.")
-        current_status = current_status_res[0]['status']
-
-        if current_status == new_status:
-            return True # No change needed
-
-        # Add state transition logic
-        if current_status == STATUS_CANCELLED or current_status == STATUS_REFUNDED:
-            raise OrderProcessingError(f"Cannot change status of a {current_status} order.")
-        
         # --- Transaction to update status and log history ---
-        conn = self.db.connect()
         try:
-            with conn:
-                now = datetime.datetime.utcnow().isoformat()
+            with self.db.transaction() as cursor:
+                now = self.db.now()
                 
-                # Step 1: Update the order
-                order_update_sql = "UPDATE orders SET status = ? WHERE order_id = ?"
-                conn.execute(order_update_sql, (new_status, order_id))
+                # Step 1: Update the order. The transition rules are in the WHERE
+                # clause, so checking and changing the status is one atomic statement.
+                order_update_sql = """
+                UPDATE orders SET status = ?
+                WHERE order_id = ? AND status NOT IN (?, ?, ?)
+                RETURNING order_id
+                """
+                updated = cursor.execute(order_update_sql, (
+                    new_status, order_id, new_status, STATUS_CANCELLED, STATUS_REFUNDED
+                )).fetchone()
+                if updated is None:
+                    # Only the refusal path reads the current status, to say why
+                    current = cursor.execute("SELECT status FROM orders WHERE order_id = ?", (order_id,)).fetchone()
+                    if current is None:
+                        raise OrderProcessingError(f"Order ID {order_id} not found.")
+                    if current['status'] == new_status:
+                        return True # No change needed
+                    raise OrderProcessingError(f"Cannot change status of a {current['status']} order.")
                 
                 # Step 2: Log the change
                 history_sql = """
                 INSERT INTO order_status_history (order_id, status, changed_at, changed_by_user_id)
                 VALUES (?, ?, ?, ?)
                 """
-                conn.execute(history_sql, (order_id, new_status, now, admin_user_id))
+                cursor.execute(history_sql, (order_id, new_status, now, admin_user_id))
                 
                 # Step 3: Interdependent action: Handle refunds
                 if new_status == STATUS_CANCELLED or new_status == STATUS_REFUNDED:
                     # This function is interdependent with ProductService
-                    self.restock_cancelled_order_items(order_id, conn)
+                    self.restock_cancelled_order_items(order_id, cursor.connection)
             
+            if self.reports and new_status in (STATUS_CANCELLED, STATUS_REFUNDED):
+                self.reports.forget_reports('get_inventory_stock_report')
             logger.info(f"Order {order_id} status updated to {new_status}" + (f" by user {admin_user_id}" if admin_user_id else ""))
             return True
 
@@ -1020,17 +1516,15 @@ class OrderService:
                 last_updated = ?
             WHERE product_id = ?
             """
-            now = datetime.datetime.utcnow().isoformat()
+            now = self.db.now()
             
-            for item in items:
-                # Use the ProductService to update stock
-                # This is complex. We're inside the OrderService transaction,
-                # so we can't use self.products.update_product_stock directly
-                # as it would start a *new* transaction.
-                # We must execute the query on the provided connection.
-                
-                db_conn.execute(inventory_update_sql, (item['quantity'], now, item['product_id']))
-                logger.info(f"Restocked {item['quantity']} of product {item['product_id']} from order {order_id}")
+            # We're inside the OrderService transaction, so the updates run
+            # on the provided connection, as one batch.
+            db_conn.executemany(inventory_update_sql, [
+                (item['quantity'], now, item['product_id']) for item in items
+            ])
+            self.products.forget_products(item['product_id'] for item in items)
+            logger.info(f"Restocked {len(items)} product lines from order {order_id}")
 
         except sqlite3.Error as e:
             logger.error(f"CRITICAL: Failed to restock items for order {order_id} during cancellation: {e}")
@@ -1082,12 +1576,18 @@ class OrderService:
         ORDER BY h.changed_at ASC
         """
         
-        order_res = self.db.execute_query(order_sql, (order_id,))
-        if not order_res:
-            raise OrderProcessingError(f"Order ID {order_id} not found.")
-            
-        items_res = self.db.execute_query(items_sql, (order_id,))
-        history_res = self.db.execute_query(history_sql, (order_id,))
+        # All three run on one pooled connection, reusing its cached statements
+        try:
+            with self.db.acquire() as conn:
+                cursor = conn.cursor()
+                order_res = cursor.execute(order_sql, (order_id,)).fetchall()
+                if not order_res:
+                    raise OrderProcessingError(f"Order ID {order_id} not found.")
+                items_res = cursor.execute(items_sql, (order_id,)).fetchall()
+                history_res = cursor.execute(history_sql, (order_id,)).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to load details for order {order_id}: {e}")
+            raise DatabaseError(f"Order details query failed: {e}")
         
         # Assemble the final nested dictionary
         order_data = dict(order_res[0])
@@ -1098,13 +1598,11 @@ class OrderService:
         order_data['shipping_fee'] = db_to_decimal(order_data['shipping_fee'])
         
         # Format items
-        order_items = []
-        for row in items_res:
-            item = dict(row)
-            item['price_at_purchase'] = db_to_decimal(item['price_at_purchase'])
-            order_items.append(item)
-            
-        order_data['items'] = order_items
+        to_decimal = db_to_decimal
+        order_data['items'] = [
+            {**dict(row), 'price_at_purchase': to_decimal(row['price_at_purchase'])}
+            for row in items_res
+        ]
         order_data['status_history'] = [dict(row) for row in history_res]
         
         return order_data
@@ -1112,10 +1610,34 @@ class OrderService:
 
 # --- Reporting Service Class ---
 
+def cached_report(method):
+    """
+    Caches a ReportingService method's result per argument set, for
+    REPORT_CACHE_TTL_SECONDS. See ReportingService.forget_reports.
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        with self._report_cache_lock:
+            cached = self._report_cache.get(key)
+            if cached is not None and cached[0] > time.monotonic():
+                self._report_cache.move_to_end(key)
+                return cached[1]
+        
+        report = method(self, *args, **kwargs)
+        with self._report_cache_lock:
+            self._report_cache[key] = (time.monotonic() + REPORT_CACHE_TTL_SECONDS, report)
+            self._report_cache.move_to_end(key)
+            if len(self._report_cache) > REPORT_CACHE_SIZE:
+                self._report_cache.popitem(last=False)
+        return report
+    return wrapper
+
 class ReportingService:
     """
     Generates complex, read-only reports for business analytics.
     These queries are often the most complex and interdependent.
+    Results are cached briefly; cached reports are shared, so callers must not modify them.
     """
     
     def __init__(self, db_manager: DatabaseManager):
@@ -1124,8 +1646,23 @@ class ReportingService:
         :param db_manager: An instance of DatabaseManager.
         """
         self.db = db_manager
+        self._report_cache: OrderedDict = OrderedDict()
+        self._report_cache_lock = threading.Lock()
         logger.info("ReportingService initialized.")
 
+    def forget_reports(self, *report_names: str):
+        """
+        Drops cached results, e.g. after the data behind them changed.
+        :param report_names: Method names to forget; forgets every report if none are given.
+        """
+        with self._report_cache_lock:
+            if not report_names:
+                self._report_cache.clear()
+                return
+            for key in [key for key in self._report_cache if key[0] in report_names]:
+                del self._report_cache[key]
+
+    @cached_report
     def get_sales_summary_by_date_range(self, start_date: str, end_date: str) -> Dict[str, Any]:
         """
         Generates a sales summary (total revenue, orders, items) for a date range.
@@ -1134,19 +1671,18 @@ class ReportingService:
         :return: A dictionary containing the summary.
         """
         
-        # This query joins orders and order_items and filters by date
+        # Filters orders by date alone; item counts are stored on each order.
         # It excludes cancelled/refunded orders from revenue.
         sql = """
         SELECT
-            COUNT(DISTINCT o.order_id) as total_orders,
-            SUM(o.total_amount) as total_revenue,
-            SUM(oi.quantity) as total_items_sold,
-            AVG(o.total_amount) as average_order_value
-        FROM orders o
-        JOIN order_items oi ON o.order_id = oi.order_id
-        WHERE o.created_at >= ? 
-          AND o.created_at <= ?
-          AND o.status NOT IN (?, ?)
+            COUNT(*) as total_orders,
+            SUM(total_amount) as total_revenue,
+            SUM(total_items) as total_items_sold,
+            CAST(ROUND(AVG(total_amount)) AS INTEGER) as average_order_value
+        FROM orders
+        WHERE created_at >= ? 
+          AND created_at <= ?
+          AND status NOT IN (?, ?)
         """
         
         # Add time to end_date to make it inclusive
@@ -1159,13 +1695,14 @@ class ReportingService:
         summary = dict(result[0])
         
         # Convert Decimals
-        summary['total_revenue'] = db_to_decimal(summary['total_revenue'] or '0.00')
-        summary['average_order_value'] = db_to_decimal(summary['average_order_value'] or '0.00')
+        summary['total_revenue'] = db_to_decimal(summary['total_revenue'] or 0)
+        summary['average_order_value'] = db_to_decimal(summary['average_order_value'] or 0)
         summary['total_orders'] = summary['total_orders'] or 0
         summary['total_items_sold'] = summary['total_items_sold'] or 0
         
         return summary
 
+    @cached_report
     def get_top_selling_products(self, limit: int = 10) -> List[Dict[str, Any]]:
         """
         Gets the top-selling products by quantity sold.
@@ -1173,34 +1710,27 @@ class ReportingService:
         :return: A list of product summary dictionaries.
         """
         
-        # This query joins products, order_items, and orders
+        # Reads the trigger-maintained totals instead of aggregating all order history
         sql = """
         SELECT
             p.product_id,
             p.name,
             p.sku,
-            SUM(oi.quantity) as total_quantity_sold,
-            SUM(oi.quantity * oi.price_at_purchase) as total_revenue
-        FROM products p
-        JOIN order_items oi ON p.product_id = oi.product_id
-        JOIN orders o ON oi.order_id = o.order_id
-        WHERE o.status NOT IN (?, ?)
-        GROUP BY p.product_id, p.name, p.sku
-        ORDER BY total_quantity_sold DESC
+            s.total_quantity_sold,
+            s.total_revenue
+        FROM product_sales_agg s
+        JOIN products p ON p.product_id = s.product_id
+        WHERE s.total_quantity_sold > 0
+        ORDER BY s.total_quantity_sold DESC
         LIMIT ?
         """
         
-        params = (STATUS_CANCELLED, STATUS_REFUNDED, limit)
-        results = self.db.execute_query(sql, params)
+        results = self.db.execute_query(sql, (limit,))
         
-        top_products = []
-        for row in results:
-            product = dict(row)
-            product['total_revenue'] = db_to_decimal(product['total_revenue'])
-            top_products.append(product)
-            
-        return top_products
+        to_decimal = db_to_decimal
+        return [{**dict(row), 'total_revenue': to_decimal(row['total_revenue'])} for row in results]
 
+    @cached_report
     def get_customer_lifetime_value_report(self, limit: int = 25) -> List[Dict[str, Any]]:
         """
         Generates a report of top customers by total amount spent (LTV).
@@ -1228,14 +1758,10 @@ class ReportingService:
         params = (STATUS_CANCELLED, STATUS_REFUNDED, limit)
         results = self.db.execute_query(sql, params)
         
-        top_customers = []
-        for row in results:
-            customer = dict(row)
-            customer['lifetime_value'] = db_to_decimal(customer['lifetime_value'])
-            top_customers.append(customer)
-            
-        return top_customers
+        to_decimal = db_to_decimal
+        return [{**dict(row), 'lifetime_value': to_decimal(row['lifetime_value'])} for row in results]
 
+    @cached_report
     def get_inventory_stock_report(self, low_stock_threshold: int = 10) -> Dict[str, List[Dict[str, Any]]]:
         """
         Generates a report of all inventory, highlighting low-stock items.
@@ -1257,20 +1783,21 @@ class ReportingService:
         ORDER BY i.quantity ASC
         """
         
-        results = self.db.execute_query(sql)
-        
         report = {
             'low_stock': [],
             'in_stock': []
         }
         
-        for row in results:
-            item = dict(row)
-            if item['quantity'] <= low_stock_threshold:
-                report['low_stock'].append(item)
-            else:
-                report['in_stock'].append(item)
-                
+        # Streamed in chunks; rows arrive in quantity order, so once one is above
+        # the threshold every later row is too
+        rows = self.db.execute_query_iter(sql)
+        for row in rows:
+            if row['quantity'] > low_stock_threshold:
+                report['in_stock'].append(dict(row))
+                break
+            report['low_stock'].append(dict(row))
+        report['in_stock'].extend(dict(row) for row in rows)
+        
         return report
 
 
@@ -1330,7 +1857,7 @@ def setup_database_schema(db_manager: DatabaseManager):
         product_id INTEGER PRIMARY KEY AUTOINCREMENT,
         name TEXT NOT NULL,
         description TEXT,
-        price TEXT NOT NULL, -- Stored as string to avoid precision loss
+        price INTEGER NOT NULL, -- In cents, to avoid precision loss
         category_id INTEGER NOT NULL,
         sku TEXT UNIQUE NOT NULL,
         average_rating REAL DEFAULT 0.0,
@@ -1341,6 +1868,22 @@ def setup_database_schema(db_manager: DatabaseManager):
     CREATE INDEX IF NOT EXISTS idx_products_name ON products (name);
     CREATE INDEX IF NOT EXISTS idx_products_category_id ON products (category_id);
 
+    -- Full-text index over product name/description, kept in sync by triggers.
+    -- The trigram tokenizer matches arbitrary substrings, like LIKE '%term%'.
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, description, content='products', content_rowid='product_id', tokenize='trigram'
+    );
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts (rowid, name, description) VALUES (new.product_id, new.name, new.description);
+    END;
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts (products_fts, rowid, name, description) VALUES ('delete', old.product_id, old.name, old.description);
+    END;
+    CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, description ON products BEGIN
+        INSERT INTO products_fts (products_fts, rowid, name, description) VALUES ('delete', old.product_id, old.name, old.description);
+        INSERT INTO products_fts (rowid, name, description) VALUES (new.product_id, new.name, new.description);
+    END;
+
     -- Inventory Table: Tracks stock for each product
     CREATE TABLE IF NOT EXISTS inventory (
         product_id INTEGER PRIMARY KEY,
@@ -1348,15 +1891,18 @@ def setup_database_schema(db_manager: DatabaseManager):
         last_updated TEXT NOT NULL,
         FOREIGN KEY (product_id) REFERENCES products (product_id) ON DELETE CASCADE
     );
+    -- Lets the stock report walk inventory in quantity order without sorting
+    CREATE INDEX IF NOT EXISTS idx_inventory_quantity ON inventory (quantity);
 
     -- Orders Table: The main record for each order
     CREATE TABLE IF NOT EXISTS orders (
         order_id INTEGER PRIMARY KEY AUTOINCREMENT,
         user_id INTEGER NOT NULL,
         status TEXT NOT NULL CHECK(status IN ('PENDING', 'PAID', 'SHIPPED', 'DELIVERED', 'CANCELLED', 'REFUNDED')),
-        total_amount TEXT NOT NULL,
-        subtotal TEXT NOT NULL,
-        shipping_fee TEXT NOT NULL,
+        total_amount INTEGER NOT NULL, -- Money columns are in cents
+        subtotal INTEGER NOT NULL,
+        shipping_fee INTEGER NOT NULL,
+        total_items INTEGER NOT NULL DEFAULT 0, -- Sum of line quantities, kept so reports needn't join order_items
         shipping_address_id INTEGER NOT NULL,
         billing_address_id INTEGER NOT NULL,
         created_at TEXT NOT NULL,
@@ -1364,9 +1910,14 @@ def setup_database_schema(db_manager: DatabaseManager):
         FOREIGN KEY (shipping_address_id) REFERENCES addresses (address_id) ON DELETE RESTRICT,
         FOREIGN KEY (billing_address_id) REFERENCES addresses (address_id) ON DELETE RESTRICT
     );
-    CREATE INDEX IF NOT EXISTS idx_orders_user_id ON orders (user_id);
+    -- The user and date indexes also carry status and total_amount, so the
+    -- lifetime-value and sales-summary reports are answered from the index alone
+    DROP INDEX IF EXISTS idx_orders_user_id;
+    DROP INDEX IF EXISTS idx_orders_created_at;
+    DROP INDEX IF EXISTS idx_orders_created_status;
+    CREATE INDEX IF NOT EXISTS idx_orders_user_status ON orders (user_id, status, total_amount);
     CREATE INDEX IF NOT EXISTS idx_orders_status ON orders (status);
-    CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders (created_at);
+    CREATE INDEX IF NOT EXISTS idx_orders_created_cover ON orders (created_at, status, total_amount, total_items);
 
     -- Order Items Table: Links products to orders (line items)
     CREATE TABLE IF NOT EXISTS order_items (
@@ -1374,12 +1925,44 @@ def setup_database_schema(db_manager: DatabaseManager):
         order_id INTEGER NOT NULL,
         product_id INTEGER NOT NULL,
         quantity INTEGER NOT NULL CHECK(quantity > 0),
-        price_at_purchase TEXT NOT NULL, -- Price at the time of order
+        price_at_purchase INTEGER NOT NULL, -- Price at the time of order, in cents
         FOREIGN KEY (order_id) REFERENCES orders (order_id) ON DELETE CASCADE,
         FOREIGN KEY (product_id) REFERENCES products (product_id) ON DELETE RESTRICT
     );
-    CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items (order_id);
-    CREATE INDEX IF NOT EXISTS idx_order_items_product_id ON order_items (product_id);
+    -- Covering indexes: order lookups and per-product sales totals never touch the table
+    DROP INDEX IF EXISTS idx_order_items_order_id;
+    DROP INDEX IF EXISTS idx_order_items_product_id;
+    CREATE INDEX IF NOT EXISTS idx_order_items_order_cover ON order_items (order_id, product_id, quantity, price_at_purchase);
+    CREATE INDEX IF NOT EXISTS idx_order_items_product_cover ON order_items (product_id, order_id, quantity, price_at_purchase);
+
+    -- Product Sales Summary: running totals for the top-selling report, excluding
+    -- cancelled/refunded orders. Kept in sync by triggers, so it is always current.
+    CREATE TABLE IF NOT EXISTS product_sales_agg (
+        product_id INTEGER PRIMARY KEY,
+        total_quantity_sold INTEGER NOT NULL DEFAULT 0,
+        total_revenue INTEGER NOT NULL DEFAULT 0, -- In cents
+        FOREIGN KEY (product_id) REFERENCES products (product_id) ON DELETE CASCADE
+    );
+    CREATE INDEX IF NOT EXISTS idx_product_sales_agg_quantity ON product_sales_agg (total_quantity_sold);
+    CREATE TRIGGER IF NOT EXISTS product_sales_agg_ai AFTER INSERT ON order_items BEGIN
+        INSERT INTO product_sales_agg (product_id, total_quantity_sold, total_revenue)
+        VALUES (new.product_id, new.quantity, new.quantity * new.price_at_purchase)
+        ON CONFLICT (product_id) DO UPDATE SET
+            total_quantity_sold = total_quantity_sold + excluded.total_quantity_sold,
+            total_revenue = total_revenue + excluded.total_revenue;
+    END;
+    CREATE TRIGGER IF NOT EXISTS product_sales_agg_cancel AFTER UPDATE OF status ON orders
+    WHEN new.status IN ('CANCELLED', 'REFUNDED') AND old.status NOT IN ('CANCELLED', 'REFUNDED') BEGIN
+        UPDATE product_sales_agg
+        SET
+            total_quantity_sold = total_quantity_sold - sold.quantity,
+            total_revenue = total_revenue - sold.revenue
+        FROM (
+            SELECT product_id, SUM(quantity) AS quantity, SUM(quantity * price_at_purchase) AS revenue
+            FROM order_items WHERE order_id = new.order_id GROUP BY product_id
+        ) AS sold
+        WHERE product_sales_agg.product_id = sold.product_id;
+    END;
 
     -- Reviews Table: User reviews for products
     CREATE TABLE IF NOT EXISTS reviews (
@@ -1393,7 +1976,9 @@ def setup_database_schema(db_manager: DatabaseManager):
         FOREIGN KEY (user_id) REFERENCES users (user_id) ON DELETE CASCADE,
         UNIQUE (product_id, user_id) -- One review per user per product
     );
-    CREATE INDEX IF NOT EXISTS idx_reviews_product_id ON reviews (product_id);
+    -- Covers the AVG(rating) lookups by product without touching the table
+    DROP INDEX IF EXISTS idx_reviews_product_id;
+    CREATE INDEX IF NOT EXISTS idx_reviews_product_rating ON reviews (product_id, rating);
 
     -- Order Status History Table: Logs all status changes for an order
     CREATE TABLE IF NOT EXISTS order_status_history (
@@ -1406,10 +1991,41 @@ def setup_database_schema(db_manager: DatabaseManager):
         FOREIGN KEY (changed_by_user_id) REFERENCES users (user_id) ON DELETE SET NULL
     );
     CREATE INDEX IF NOT EXISTS idx_order_status_history_order_id ON order_status_history (order_id);
+
+    -- Refresh planner statistics where they are missing or stale (cheap when nothing changed)
+    PRAGMA optimize;
+    """
+    
+    # Fills product_sales_agg from order history, when the table is first created
+    sales_backfill_sql = """
+    INSERT INTO product_sales_agg (product_id, total_quantity_sold, total_revenue)
+    SELECT oi.product_id, SUM(oi.quantity), SUM(oi.quantity * oi.price_at_purchase)
+    FROM order_items oi
+    JOIN orders o ON oi.order_id = o.order_id
+    WHERE o.status NOT IN (?, ?)
+    GROUP BY oi.product_id
+    """
+    
+    # Adds orders.total_items to databases created before it existed
+    total_items_migration = """
+    ALTER TABLE orders ADD COLUMN total_items INTEGER NOT NULL DEFAULT 0;
+    UPDATE orders SET total_items = COALESCE(
+        (SELECT SUM(quantity) FROM order_items WHERE order_items.order_id = orders.order_id), 0
+    );
     """
     
     try:
+        order_columns = {row['name'] for row in db_manager.execute_query("SELECT name FROM pragma_table_info('orders')")}
+        if order_columns and 'total_items' not in order_columns:
+            db_manager.execute_script(total_items_migration)
+        fts_exists = db_manager.execute_query("SELECT 1 FROM sqlite_master WHERE name = 'products_fts'")
+        sales_agg_exists = db_manager.execute_query("SELECT 1 FROM sqlite_master WHERE name = 'product_sales_agg'")
         db_manager.execute_script(schema_script)
+        if not fts_exists:
+            # Index any products that predate the full-text table
+            db_manager.execute_update("INSERT INTO products_fts (products_fts) VALUES ('rebuild')")
+        if not sales_agg_exists:
+            db_manager.execute_update(sales_backfill_sql, (STATUS_CANCELLED, STATUS_REFUNDED))
         logger.info("Database schema verified/created successfully.")
     except DatabaseError as e:
         logger.critical(f"FATAL: Could not initialize database schema: {e}")
@@ -1431,8 +2047,8 @@ def main():
     
     user_service = UserService(db_manager)
     product_service = ProductService(db_manager)
-    order_service = OrderService(db_manager, user_service, product_service)
     reporting_service = ReportingService(db_manager)
+    order_service = OrderService(db_manager, user_service, product_service, reporting_service)
     
     logger.info("All services initialized.")
     
@@ -1448,6 +2064,7 @@ def main():
             db_manager.execute_update("UPDATE users SET role = ? WHERE email = ?", (ROLE_ADMIN, "admin@example.com"))
             admin_user = user_service.find_user_by_email("admin@example.com")
             admin_id = admin_user['user_id']
+            user_service.forget_role(admin_id)
             logger.info(f"Admin user created/promoted with ID: {admin_id}")
 
         user_id_1 = user_service.register_user("alice@example.com", "AlicePass123", "Alice", "Smith")
@@ -1458,9 +2075,14 @@ def main():
         cat_id_electronics = product_service.add_product_category("Electronics", "Gadgets and devices")
         cat_id_books = product_service.add_product_category("Books", "Paperback and hardcover books")
         
-        prod_id_laptop = product_service.add_product("Pro Laptop 15\"", "A powerful laptop", Decimal("1299.99"), cat_id_electronics, 50, "SKU-LAP-001")
-        prod_id_phone = product_service.add_product("Smart Phone X", "The latest smartphone", Decimal("799.00"), cat_id_electronics, 150, "SKU-PHN-002")
-        prod_id_book = product_service.add_product("Database Design", "A book on SQL", Decimal("49.95"), cat_id_books, 200, "SKU-BOK-003")
+        prod_id_laptop, prod_id_phone, prod_id_book = product_service.add_products_bulk([
+            {'name': "Pro Laptop 15\"", 'description': "A powerful laptop", 'price': Decimal("1299.99"),
+             'category_id': cat_id_electronics, 'stock_quantity': 50, 'sku': "SKU-LAP-001"},
+            {'name': "Smart Phone X", 'description': "The latest smartphone", 'price': Decimal("799.00"),
+             'category_id': cat_id_electronics, 'stock_quantity': 150, 'sku': "SKU-PHN-002"},
+            {'name': "Database Design", 'description': "A book on SQL", 'price': Decimal("49.95"),
+             'category_id': cat_id_books, 'stock_quantity': 200, 'sku': "SKU-BOK-003"},
+        ])
 
         # --- Demo 3: Users update profile and add reviews ---
         logger.info("Demo 3: Updating profiles and adding reviews...")
@@ -1472,7 +2094,7 @@ def main():
             'country': 'USA'
         })
         profile = user_service.get_user_profile(user_id_1)
-        alice_addr_id = profile['addresses'][0]['address_id']
+        alice_addr_id = profile['addresses'][0].address_id
         
         product_service.add_product_review(user_id_1, prod_id_laptop, 5, "Amazing laptop! Super fast.")
         product_service.add_product_review(user_id_2, prod_id_laptop, 4, "Pretty good, but battery could be better.")
@@ -1530,7 +2152,7 @@ def main():
         # --- Demo 8: Run Reports ---
         logger.info("Demo 8: Running reports...")
         
-        sales_summary = reporting_service.get_sales_summary_by_date_range('2020-01-01', datetime.datetime.utcnow().strftime('%Y-%m-%d'))
+        sales_summary = reporting_service.get_sales_summary_by_date_range('2020-01-01', time.strftime('%Y-%m-%d', time.gmtime()))
         logger.info(f"Sales Summary: {json.dumps(sales_summary, default=str, indent=2)}")
         
         top_products = reporting_service.get_top_selling_products()
@@ -1575,14 +2197,20 @@ Version: 1.0.0
 # Standard Library Imports
 import sqlite3
 import logging
-import datetime
 import hashlib
+import hmac
 import json
+import os
+import queue
+import threading
 import uuid
 import re
-from decimal import Decimal, getcontext
-from typing import List, Dict, Any, Optional, Tuple, Union
-from collections import namedtuple
+import time
+from decimal import Decimal, ROUND_HALF_UP, getcontext
+from typing import List, Dict, Any, Optional, Tuple, Iterable
+from collections import namedtuple, OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache, wraps
 
 # Set precision for Decimal operations
 getcontext().prec = 10
@@ -1591,6 +2219,25 @@ getcontext().prec = 10
 
 # Database Configuration
 DB_NAME = 'ecommerce_main.db'
+# Prepared statements kept per connection, keyed by SQL text. Sized to hold
+# every distinct query in this module so hot SQL is never re-parsed, including
+# one variant per row count (up to MAX_ORDER_ITEMS) of each multi-row statement.
+DB_CACHED_STATEMENTS = 512
+# Connections kept per DatabaseManager, and how long a thread waits for one
+# to be returned once all of them are lent out.
+DB_POOL_SIZE = 8
+DB_POOL_TIMEOUT_SECONDS = 30
+# Applied to every new connection. WAL lets readers run alongside the writer,
+# and synchronous=NORMAL is still durable in WAL mode without an fsync per commit.
+DB_PRAGMAS = """
+PRAGMA journal_mode = WAL;
+PRAGMA synchronous = NORMAL;
+PRAGMA temp_store = MEMORY;
+PRAGMA mmap_size = 268435456;
+PRAGMA cache_size = -65536;
+PRAGMA busy_timeout = 5000;
+PRAGMA foreign_keys = ON;
+"""
 
 # Logging Configuration
 logging.basicConfig(level=logging.INFO,
@@ -1600,12 +2247,31 @@ logger = logging.getLogger(__name__)
 
 # Application Constants
 DEFAULT_CURRENCY = 'USD'
-PASSWORD_SALT = 'a_very_secret_ecommerce_salt_string'
+PASSWORD_SALT = 'a_very_secret_ecommerce_salt_string'  # Used as a pepper, on top of per-user salts
+PASSWORD_SALT_BYTES = 16
+SCRYPT_N, SCRYPT_R, SCRYPT_P, SCRYPT_DKLEN = 2**14, 8, 1, 32
 MIN_PASSWORD_LENGTH = 8
 MAX_ORDER_ITEMS = 50
-SHIPPING_FEE_STANDARD = Decimal('5.99')
-SHIPPING_FEE_EXPRESS = Decimal('15.99')
-FREE_SHIPPING_THRESHOLD = Decimal('100.00')
+# Rows per multi-row INSERT in bulk loads (6 parameters each, well under SQLite's limit)
+BULK_INSERT_ROWS = 500
+ROLE_CACHE_SIZE = 1024
+ROLE_CACHE_TTL_SECONDS = 60
+PRODUCT_CACHE_SIZE = 1024
+PRODUCT_CACHE_TTL_SECONDS = 30
+PRODUCT_PREWARM_COUNT = 512
+REPORT_CACHE_SIZE = 256
+REPORT_CACHE_TTL_SECONDS = 60
+# Money is handled as integer cents internally; Decimal only at the API boundary
+SHIPPING_FEE_STANDARD = 599
+SHIPPING_FEE_EXPRESS = 1599
+FREE_SHIPPING_THRESHOLD = 10000
+# (method, qualifies for free shipping) -> fee in cents; other methods pay standard
+SHIPPING_FEES = {
+    ('STANDARD', True): 0,
+    ('STANDARD', False): SHIPPING_FEE_STANDARD,
+    ('EXPRESS', True): SHIPPING_FEE_EXPRESS,
+    ('EXPRESS', False): SHIPPING_FEE_EXPRESS,
+}
 
 # Order Statuses (simulating an Enum)
 STATUS_PENDING = 'PENDING'
@@ -1631,7 +2297,7 @@ class ValidationError(ValueError):
     """Exception raised for data validation failures."""
     pass
 
-class AuthenticationError(SecurityException):
+class AuthenticationError(Exception):
     """Exception raised for auth failures."""
     pass
 
@@ -1652,38 +2318,106 @@ class DatabaseManager:
     This class is instantiated and used by all other services.
     """
 
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, pool_size: int = DB_POOL_SIZE):
         """
         Initializes the database manager.
         :param db_path: Filesystem path to the SQLite database.
+        :param pool_size: Maximum number of connections to keep open.
         """
         self.db_path = db_path
-        self.connection = None
-        logger.info(f"DatabaseManager initialized for: {db_path}")
+        self.pool_size = pool_size
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._pool_lock = threading.Lock()
+        self._local = threading.local()
+        logger.info("DatabaseManager initialized for: %s", db_path)
 
-    def connect(self) -> sqlite3.Connection:
+    def _open_connection(self) -> sqlite3.Connection:
         """
-        Establishes and returns a database connection.
+        Opens and configures a new connection for the pool.
         """
         try:
-            if not self.connection or self.connection.total_changes == -1:
-                self.connection = sqlite3.connect(self.db_path)
-                self.connection.row_factory = sqlite3.Row
-                self.connection.execute("PRAGMA foreign_keys = ON;")
-                logger.info("New database connection established.")
-            return self.connection
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None,
+                                   cached_statements=DB_CACHED_STATEMENTS)
+            conn.row_factory = sqlite3.Row
+            conn.executescript(DB_PRAGMAS)
+            logger.info("New database connection established.")
+            return conn
         except sqlite3.Error as e:
-            logger.error(f"Failed to connect to database at {self.db_path}: {e}")
+            logger.error("Failed to connect to database at %s: %s", self.db_path, e)
             raise DatabaseError(f"Database connection failure: {e}")
 
-    def disconnect(self):
+    def _checkout(self) -> sqlite3.Connection:
         """
-        Closes the database connection if it exists.
+        Takes an idle connection, opening a new one while under pool_size,
+        otherwise waiting for another thread to return one.
         """
-        if self.connection:
-            self.connection.close()
-            self.connection = None
-            logger.info("Database connection closed.")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._pool_lock:
+            can_open = self._opened < self.pool_size
+            if can_open:
+                self._opened += 1
+        if can_open:
+            try:
+                return self._open_connection()
+            except DatabaseError:
+                with self._pool_lock:
+                    self._opened -= 1
+                raise
+        try:
+            return self._idle.get(timeout=DB_POOL_TIMEOUT_SECONDS)
+        except queue.Empty:
+            raise DatabaseError(f"No database connection available after {DB_POOL_TIMEOUT_SECONDS}s.")
+
+    @contextmanager
+    def acquire(self):
+        """
+        Lends a pooled connection to the calling thread for the block.
+        Re-entrant: nested acquire() calls on the same thread get the connection
+        already lent, so helpers called inside a transaction() join it.
+        :return: A context manager yielding a sqlite3.Connection.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield conn
+            return
+        conn = self._checkout()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    def connect(self) -> None:
+        """
+        Opens the first pooled connection if none is open yet, so connection
+        problems surface at startup rather than on the first query.
+        """
+        with self.acquire():
+            pass
+
+    def disconnect(self):
+        """
+        Closes every idle connection in the pool.
+        """
+        closed = 0
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            closed += 1
+        with self._pool_lock:
+            self._opened -= closed
+        if closed:
+            logger.info("Closed %d database connection(s).", closed)
 
     def execute_query(self, query: str, params: tuple = ()) -> List[sqlite3.Row]:
         """
@@ -1692,16 +2426,36 @@ class DatabaseManager:
         :param params: A tuple of parameters to bind to the query.
         :return: A list of sqlite3.Row objects.
         """
-        conn = self.connect()
         try:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute(query, params)
-                results = cursor.fetchall()
-                logger.debug(f"Executed SELECT query: {query[:100]}... with params: {params}")
-                return results
+            with self.acquire() as conn:
+                results = conn.execute(query, params).fetchall()
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Executed SELECT query: %.100s... with params: %r", query, params)
+            return results
+        except sqlite3.Error as e:
+            logger.error("Failed to execute query '%.100s...': %s", query, e)
+            raise DatabaseError(f"Query execution failed: {e}")
+
+    def execute_query_iter(self, query: str, params: tuple = (), chunk_size: int = 1024):
+        """
+        Executes a SELECT query and yields its rows, fetching chunk_size at a time,
+        so large results never sit in memory all at once. The pooled connection is
+        held until the generator is exhausted or closed.
+        :param query: The SQL query string.
+        :param params: A tuple of parameters to bind to the query.
+        :param chunk_size: Rows fetched per round trip.
+        :return: A generator of sqlite3.Row objects.
+        """
+        try:
+            with self.acquire() as conn:
+                cursor = conn.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield from rows
         except sqlite3.Error as e:
-            logger.error(f"Failed to execute query '{query[:100]}...': {e}")
+            logger.error("Failed to execute query '%.100s...': %s", query, e)
             raise DatabaseError(f"Query execution failed: {e}")
 
     def execute_script(self, script: str) -> None:
@@ -1709,13 +2463,12 @@ class DatabaseManager:
         Executes a SQL script (multiple statements).
         :param script: The SQL script string.
         """
-        conn = self.connect()
         try:
-            with conn:
+            with self.acquire() as conn:
                 conn.executescript(script)
-                logger.info(f"Executed SQL script: {script[:100]}...")
+            logger.info("Executed SQL script: %.100s...", script)
         except sqlite3.Error as e:
-            logger.error(f"Failed to execute script: {e}")
+            logger.error("Failed to execute script: %s", e)
             raise DatabaseError(f"Script execution failed: {e}")
 
     def execute_update(self, query: str, params: tuple = ()) -> int:
@@ -1725,16 +2478,14 @@ class DatabaseManager:
         :param params: A tuple of parameters to bind to the query.
         :return: The number of rows affected.
         """
-        conn = self.connect()
         try:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute(query, params)
-                rowcount = cursor.rowcount
-                logger.debug(f"Executed UPDATE query: {query[:100]}... with params: {params}. Rows affected: {rowcount}")
-                return rowcount
+            with self.acquire() as conn:
+                rowcount = conn.execute(query, params).rowcount
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Executed UPDATE query: %.100s... with params: %r. Rows affected: %d", query, params, rowcount)
+            return rowcount
         except sqlite3.Error as e:
-            logger.error(f"Failed to execute update query '{query[:100]}...': {e}")
+            logger.error("Failed to execute update query '%.100s...': %s", query, e)
             raise DatabaseError(f"Update query execution failed: {e}")
 
     def execute_insert_get_id(self, query: str, params: tuple = ()) -> int:
@@ -1744,38 +2495,163 @@ class DatabaseManager:
         :param params: A tuple of parameters to bind to the query.
         :return: The last inserted row ID.
         """
-        conn = self.connect()
         try:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute(query, params)
-                last_id = cursor.lastrowid
-                logger.debug(f"Executed INSERT query: {query[:100]}... with params: {params}. New ID: {last_id}")
-                return last_id
+            with self.acquire() as conn:
+                last_id = conn.execute(query, params).lastrowid
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Executed INSERT query: %.100s... with params: %r. New ID: %s", query, params, last_id)
+            return last_id
         except sqlite3.Error as e:
-            logger.error(f"Failed to execute insert query '{query[:100]}...': {e}")
+            logger.error("Failed to execute insert query '%.100s...': %s", query, e)
             raise DatabaseError(f"Insert query execution failed: {e}")
 
-    def __del__(self):
+    def checkpoint(self) -> None:
         """
-        Destructor to ensure connection is closed.
+        Copies the WAL back into the database file and truncates it.
+        SQLite checkpoints automatically every 1000 pages, but those passive
+        checkpoints can't finish while readers are active; call this from a
+        maintenance job to keep the WAL from growing under steady read load.
+        """
+        try:
+            with self.acquire() as conn:
+                busy, wal_pages, moved = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+            logger.info("WAL checkpoint: busy=%d, wal pages=%d, checkpointed=%d", busy, wal_pages, moved)
+        except sqlite3.Error as e:
+            logger.error("WAL checkpoint failed: %s", e)
+            raise DatabaseError(f"WAL checkpoint failed: {e}")
+
+    @contextmanager
+    def transaction(self):
+        """
+        Runs a block of writes in one BEGIN...COMMIT, rolling back on any error.
+        The calling thread keeps one pooled connection for the whole block, and
+        helper calls made on this manager inside it share that connection,
+        so they join the transaction rather than committing on their own; so do
+        nested transaction() blocks.
+        Timestamps from now() are fixed for the duration of the block.
+        :return: A context manager yielding a cursor.
+        """
+        with self.acquire() as conn:
+            if conn.in_transaction:
+                # Nested: the enclosing transaction() commits or rolls back
+                yield conn.cursor()
+                return
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            self._local.tx_now = utc_now_iso()
+            try:
+                yield cursor
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                self._local.tx_now = None
+            conn.commit()
+
+    def now(self) -> str:
+        """
+        Returns the timestamp to record for a write. Inside transaction() it is
+        taken once, when the outermost block begins, so every row the transaction
+        writes carries the same time; outside one it is the current time.
+        :return: An ISO-8601 UTC timestamp string.
+        """
+        return getattr(self._local, 'tx_now', None) or utc_now_iso()
+
+    def __enter__(self) -> 'DatabaseManager':
+        """
+        Opens the pool for a `with DatabaseManager(path) as db:` block.
+        """
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Closes the pooled connections when the block exits, even on error.
         """
         self.disconnect()
 
 
 # --- Utility Functions ---
 
-def hash_password(password: str) -> str:
+# (second, 'YYYY-MM-DDTHH:MM:SS') for the last second formatted. One tuple, read
+# and replaced in single steps, so threads never pair a second with another's prefix.
+_iso_cache = (-1, '')
+
+def utc_now_iso() -> str:
+    """
+    Returns the current UTC time as an ISO-8601 string with microseconds.
+    The 'YYYY-MM-DDTHH:MM:SS' part is formatted once per second and reused.
+    :return: e.g. '2024-05-01T12:30:45.123456'.
+    """
+    global _iso_cache
+    second, micros = divmod(time.time_ns() // 1000, 1_000_000)
+    cached_second, prefix = _iso_cache
+    if cached_second != second:
+        prefix = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(second))
+        _iso_cache = (second, prefix)
+    return f"{prefix}.{micros:06d}"
+
+_LIKE_ESCAPES = str.maketrans({'\\': '\\\\', '%': '\\%', '_': '\\_'})
+
+def like_contains(term: str) -> str:
+    """
+    Builds a LIKE pattern matching `term` anywhere, for use with ESCAPE '\\'.
+    :param term: The literal text to look for; % and _ in it are not wildcards.
+    :return: The escaped '%term%' pattern.
+    """
+    return f"%{term.translate(_LIKE_ESCAPES)}%"
+
+# Address columns a user may update, in the order they appear in the SET clause
+ADDRESS_UPDATE_FIELDS = ('street_line1', 'street_line2', 'city', 'state', 'postal_code', 'country')
+
+@lru_cache(maxsize=64)
+def address_update_sql(fields: Tuple[str, ...]) -> str:
+    """
+    Builds the UPDATE statement for one combination of address fields.
+    Cached, so each combination is only assembled once.
+    :param fields: Columns to set, in ADDRESS_UPDATE_FIELDS order.
+    :return: The SQL string.
+    """
+    return f"""
+        UPDATE addresses
+        SET {', '.join(f'{field} = ?' for field in fields)}
+        WHERE user_id = ? AND address_id = ?
+        """
+
+_PEPPER = PASSWORD_SALT.encode('utf-8')
+
+def _scrypt(password: str, salt: bytes) -> bytes:
+    return hashlib.scrypt(password.encode('utf-8'), salt=salt + _PEPPER,
+                          n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P, dklen=SCRYPT_DKLEN)
+
+def hash_password(password: str, salt: Optional[bytes] = None) -> str:
     """
-    Hashes a password with a static salt using SHA-256.
+    Hashes a password with scrypt, using a per-user salt plus the app-wide pepper.
     :param password: The plaintext password.
-    :return: The hashed password as a hex digest.
+    :param salt: Salt bytes; a fresh random salt is generated if omitted.
+    :return: The salt and derived key as 'salt_hex:key_hex'.
     """
     if not password or len(password) < MIN_PASSWORD_LENGTH:
         raise ValidationError(f"Password must be at least {MIN_PASSWORD_LENGTH} characters long.")
     
-    salted_password = password + PASSWORD_SALT
-    return hashlib.sha256(salted_password.encode('utf-8')).hexdigest()
+    if salt is None:
+        salt = os.urandom(PASSWORD_SALT_BYTES)
+    return salt.hex() + ':' + _scrypt(password, salt).hex()
+
+def verify_password(password: str, stored_hash: str) -> bool:
+    """
+    Checks a password against a hash produced by hash_password, in constant time.
+    :param password: The plaintext password.
+    :param stored_hash: The stored 'salt_hex:key_hex' value.
+    :return: True if the password matches, False otherwise.
+    """
+    salt_hex, sep, key_hex = stored_hash.partition(':')
+    if not sep:
+        return False
+    candidate = _scrypt(password, bytes.fromhex(salt_hex)).hex()
+    return hmac.compare_digest(candidate, key_hex)
+
+_EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', re.ASCII)
 
 def validate_email(email: str) -> bool:
     """
@@ -1783,8 +2659,7 @@ def validate_email(email: str) -> bool:
     :param email: The email string to validate.
     :return: True if valid, False otherwise.
     """
-    regex = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(regex, email) is not None
+    return _EMAIL_RE.fullmatch(email) is not None
 
 def generate_api_key() -> str:
     """
@@ -1793,21 +2668,21 @@ def generate_api_key() -> str:
     """
     return str(uuid.uuid4())
 
-def decimal_to_db(value: Decimal) -> str:
+def decimal_to_db(value: Decimal) -> int:
     """
-    Converts a Decimal to a string for database storage.
+    Converts a Decimal amount to integer cents for database storage.
     :param value: The Decimal value.
-    :return: A string representation.
+    :return: The amount in cents (half-up rounding).
     """
-    return str(value)
+    return int((value * 100).to_integral_value(ROUND_HALF_UP))
 
-def db_to_decimal(value: Union[str, float, int]) -> Decimal:
+def db_to_decimal(value: int) -> Decimal:
     """
-    Converts a database value (str, float, int) to a Decimal.
-    :param value: The value from the database.
+    Converts integer cents from the database to a 2-place Decimal.
+    :param value: The amount in cents.
     :return: A Decimal object.
     """
-    return Decimal(value)
+    return Decimal(value).scaleb(-2)
 
 
 # --- User Service Class ---
@@ -1817,12 +2692,23 @@ class UserService:
     Manages user registration, authentication, and profile data.
     """
 
+    # Public user columns; password_hash is only read where it is checked
+    USER_COLUMNS = "user_id, email, first_name, last_name, role, created_at"
+
+    Address = namedtuple('Address', [
+        'address_id', 'street_line1', 'street_line2', 'city', 'state', 'postal_code', 'country',
+        'is_default_shipping', 'is_default_billing'
+    ])
+
     def __init__(self, db_manager: DatabaseManager):
         """
         Initializes the user service.
         :param db_manager: An instance of DatabaseManager.
         """
         self.db = db_manager
+        # LRU of user_id -> (expires_at, role) for permission checks
+        self._role_cache: OrderedDict = OrderedDict()
+        self._role_cache_lock = threading.Lock()
         logger.info("UserService initialized.")
 
     def register_user(self, email: str, password: str, first_name: str, last_name: str) -> int:
@@ -1836,13 +2722,9 @@ class UserService:
         """
         if not validate_email(email):
             raise ValidationError("Invalid email format.")
-        
-        # Check for existing user
-        if self.find_user_by_email(email):
-            raise ValidationError("Email already registered.")
             
         hashed_pass = hash_password(password)
-        created_at = datetime.datetime.utcnow().isoformat()
+        created_at = self.db.now()
         
         sql = """
         INSERT INTO users (email, password_hash, first_name, last_name, role, created_at, last_login)
@@ -1850,17 +2732,25 @@ class UserService:
         """
         
         try:
-            user_id = self.db.execute_insert_get_id(sql, (
-                email, hashed_pass, first_name, last_name, ROLE_CUSTOMER, created_at, created_at
-            ))
+            with self.db.transaction() as cursor:
+                cursor.execute(sql, (
+                    email, hashed_pass, first_name, last_name, ROLE_CUSTOMER, created_at, created_at
+                ))
+                user_id = cursor.lastrowid
+                
+                # Create a default shipping address entry, committed together with the user
+                self.create_default_address(user_id)
             logger.info(f"New user registered with ID: {user_id} and email: {email}")
-            
-            # Create a default shipping address entry
-            self.create_default_address(user_id)
             return user_id
-        except DatabaseError as e:
+        except sqlite3.IntegrityError as e:
+            # Email uniqueness is enforced by the UNIQUE constraint, not a lookup beforehand
+            if 'users.email' in str(e):
+                raise ValidationError("Email already registered.")
+            logger.error(f"Failed to register user {email}: {e}")
+            raise DatabaseError(f"User registration failed: {e}")
+        except sqlite3.Error as e:
             logger.error(f"Failed to register user {email}: {e}")
-            raise
+            raise DatabaseError(f"User registration failed: {e}")
 
     def create_default_address(self, user_id: int):
         """
@@ -1885,13 +2775,14 @@ class UserService:
         :param password: User's plaintext password.
         :return: A dictionary of user data if successful.
         """
-        user = self.find_user_by_email(email)
-        if not user:
+        sql = f"SELECT {self.USER_COLUMNS}, password_hash FROM users WHERE email = ? LIMIT 1"
+        results = self.db.execute_query(sql, (email,))
+        if not results:
             logger.warning(f"Auth failed: No user found for email {email}")
             raise AuthenticationError("Invalid email or password.")
+        user = results[0]
             
-        hashed_pass = hash_password(password)
-        if user['password_hash'] != hashed_pass:
+        if not verify_password(password, user['password_hash']):
             logger.warning(f"Auth failed: Incorrect password for email {email}")
             raise AuthenticationError("Invalid email or password.")
             
@@ -1899,7 +2790,10 @@ class UserService:
         self.update_last_login(user['user_id'])
         
         logger.info(f"User authenticated successfully: {email}")
-        return dict(user)
+        # The hash was only needed for the check; don't hand it to callers
+        user_data = dict(user)
+        del user_data['password_hash']
+        return user_data
 
     def find_user_by_email(self, email: str) -> Optional[sqlite3.Row]:
         """
@@ -1907,7 +2801,7 @@ class UserService:
         :param email: The email to search for.
         :return: A sqlite3.Row object or None if not found.
         """
-        sql = "SELECT * FROM users WHERE email = ? LIMIT 1"
+        sql = f"SELECT {self.USER_COLUMNS} FROM users WHERE email = ? LIMIT 1"
         results = self.db.execute_query(sql, (email,))
         return results[0] if results else None
 
@@ -1917,16 +2811,48 @@ class UserService:
         :param user_id: The ID to search for.
         :return: A sqlite3.Row object or None if not found.
         """
-        sql = "SELECT * FROM users WHERE user_id = ? LIMIT 1"
+        sql = f"SELECT {self.USER_COLUMNS} FROM users WHERE user_id = ? LIMIT 1"
         results = self.db.execute_query(sql, (user_id,))
         return results[0] if results else None
 
+    def get_user_role(self, user_id: int) -> Optional[str]:
+        """
+        Looks up only a user's role, for permission checks.
+        Roles are cached for ROLE_CACHE_TTL_SECONDS; change_user_role evicts the entry.
+        :param user_id: The user's ID.
+        :return: The role, or None if the user does not exist.
+        """
+        with self._role_cache_lock:
+            cached = self._role_cache.get(user_id)
+            if cached is not None and cached[0] > time.monotonic():
+                self._role_cache.move_to_end(user_id)
+                return cached[1]
+        
+        results = self.db.execute_query("SELECT role FROM users WHERE user_id = ?", (user_id,))
+        if not results:
+            return None
+        role = results[0][0]
+        with self._role_cache_lock:
+            self._role_cache[user_id] = (time.monotonic() + ROLE_CACHE_TTL_SECONDS, role)
+            self._role_cache.move_to_end(user_id)
+            if len(self._role_cache) > ROLE_CACHE_SIZE:
+                self._role_cache.popitem(last=False)
+        return role
+
+    def forget_role(self, user_id: int):
+        """
+        Drops a user's cached role, after it was changed outside change_user_role.
+        :param user_id: The user's ID.
+        """
+        with self._role_cache_lock:
+            self._role_cache.pop(user_id, None)
+
     def update_last_login(self, user_id: int):
         """
         Updates the last_login timestamp for a user.
         :param user_id: The user's ID.
         """
-        now = datetime.datetime.utcnow().isoformat()
+        now = self.db.now()
         sql = "UPDATE users SET last_login = ? WHERE user_id = ?"
         try:
             self.db.execute_update(sql, (now, user_id))
@@ -1938,32 +2864,56 @@ class UserService:
         """
         Retrieves a user's profile and their associated addresses.
         :param user_id: The user's ID.
-        :return: A dictionary containing user info and a list of addresses.
+        :return: A dictionary containing user info and a list of Address tuples.
         """
-        user_sql = """
-        SELECT user_id, email, first_name, last_name, role, created_at 
-        FROM users 
-        WHERE user_id = ?
-        """
-        address_sql = """
-        SELECT address_id, street_line1, street_line2, city, state, postal_code, country, is_default_shipping, is_default_billing
-        FROM addresses
-        WHERE user_id = ?
-        ORDER BY is_default_shipping DESC, address_id
+        # One row per address (or a single row with NULL address columns)
+        sql = """
+        SELECT 
+            u.user_id, u.email, u.first_name, u.last_name, u.role, u.created_at,
+            a.address_id, a.street_line1, a.street_line2, a.city, a.state, a.postal_code, a.country,
+            a.is_default_shipping, a.is_default_billing
+        FROM users u
+        LEFT JOIN addresses a ON a.user_id = u.user_id
+        WHERE u.user_id = ?
+        ORDER BY a.is_default_shipping DESC, a.address_id
         """
         
-        user_results = self.db.execute_query(user_sql, (user_id,))
-        if not user_results:
+        results = self.db.execute_query(sql, (user_id,))
+        if not results:
             raise ValidationError(f"User not found with ID: {user_id}")
-            
-        address_results = self.db.execute_query(address_sql, (user_id,))
         
+        keys = results[0].keys()
+        split = keys.index('address_id')
         profile = {
-            "user_info": dict(user_results[0]),
-            "addresses": [dict(row) for row in address_results]
+            "user_info": {key: results[0][key] for key in keys[:split]},
+            "addresses": [
+                self.Address(*row[split:])
+                for row in results if row['address_id'] is not None
+            ]
         }
         return profile
 
+    def owns_addresses(self, user_id: int, *address_ids: int) -> bool:
+        """
+        Checks that every given address belongs to the user, without loading the profile.
+        :param user_id: The user's ID.
+        :param address_ids: The address IDs to check (duplicates are fine).
+        :return: True if the user owns all of them, False otherwise.
+        """
+        wanted = set(address_ids)
+        marks = ", ".join(["?"] * len(wanted))
+        # The LEFT JOIN keeps one row for an existing user even when no address matches
+        sql = f"""
+        SELECT a.address_id
+        FROM users u
+        LEFT JOIN addresses a ON a.user_id = u.user_id AND a.address_id IN ({marks})
+        WHERE u.user_id = ?
+        """
+        results = self.db.execute_query(sql, (*wanted, user_id))
+        if not results:
+            raise ValidationError(f"User not found with ID: {user_id}")
+        return {row['address_id'] for row in results} >= wanted
+
     def update_user_address(self, user_id: int, address_id: int, address_data: Dict[str, Any]) -> int:
         """
         Updates a specific address for a user.
@@ -1972,27 +2922,16 @@ class UserService:
         :param address_data: A dict with new address fields.
         :return: Number of rows-affected.
         """
-        allowed_fields = ['street_line1', 'street_line2', 'city', 'state', 'postal_code', 'country']
-        updates = []
-        params = []
-        
-        for key, value in address_data.items():
-            if key in allowed_fields:
-                updates.append(f"{key} = ?")
-                params.append(value)
+        # Canonical field order, so the same fieldset always maps to the same SQL
+        fields = tuple(field for field in ADDRESS_UPDATE_FIELDS if field in address_data)
         
-        if not updates:
+        if not fields:
             raise ValidationError("No valid address fields provided for update.")
             
+        params = [address_data[field] for field in fields]
         params.extend([user_id, address_id])
         
-        sql = f"""
-        UPDATE addresses
-        SET {', '.join(updates)}
-        WHERE user_id = ? AND address_id = ?
-        """
-        
-        return self.db.execute_update(sql, tuple(params))
+        return self.db.execute_update(address_update_sql(fields), tuple(params))
 
     def change_user_role(self, target_user_id: int, new_role: str, admin_user_id: int) -> bool:
         """
@@ -2002,8 +2941,7 @@ class UserService:
         :param admin_user_id: The ID of the user performing the action (must be ADMIN).
         :return: True on success.
         """
-        admin = self.find_user_by_id(admin_user_id)
-        if not admin or admin['role'] != ROLE_ADMIN:
+        if self.get_user_role(admin_user_id) != ROLE_ADMIN:
             logger.error(f"Permission denied: User {admin_user_id} attempted to change role for {target_user_id}")
             raise AuthenticationError("You do not have permission to perform this action.")
             
@@ -2018,6 +2956,7 @@ class UserService:
         
         if rows_affected == 0:
             raise ValidationError(f"Target user {target_user_id} not found.")
+        self.forget_role(target_user_id)
             
         logger.info(f"Admin {admin_user_id} changed role for user {target_user_id} to {new_role}")
         return True
@@ -2030,12 +2969,26 @@ class ProductService:
     Manages product catalog, categories, reviews, and inventory levels.
     """
 
+    SearchResult = namedtuple('SearchResult', [
+        'product_id', 'name', 'price', 'sku', 'category_name', 'stock_quantity', 'average_rating'
+    ])
+
+    # Columns order validation needs; shared by the cache warm-up and lookups
+    STOCK_AND_PRICE_SQL = """
+        SELECT p.product_id, p.name, p.sku, p.price, i.quantity as stock_quantity
+        FROM products p
+        JOIN inventory i ON p.product_id = i.product_id
+        """
+
     def __init__(self, db_manager: DatabaseManager):
         """
         Initializes the product service.
         :param db_manager: An instance of DatabaseManager.
         """
         self.db = db_manager
+        # product_id -> (expires_at, row), in LRU order
+        self._product_cache: OrderedDict = OrderedDict()
+        self._product_cache_lock = threading.Lock()
         logger.info("ProductService initialized.")
 
     def add_product_category(self, name: str, description: str, parent_category_id: Optional[int] = None) -> int:
@@ -2063,16 +3016,11 @@ class ProductService:
         :param sku: Stock Keeping Unit (must be unique).
         :return: The new product ID.
         """
-        if price <= Decimal('0.00'):
+        db_price = decimal_to_db(price)
+        if db_price <= 0:
             raise ValidationError("Price must be positive.")
         if stock_quantity < 0:
             raise ValidationError("Stock quantity cannot be negative.")
-            
-        # Check for unique SKU
-        if self.get_product_by_sku(sku):
-            raise ValidationError(f"SKU '{sku}' already exists.")
-            
-        db_price = decimal_to_db(price)
         
         product_sql = """
         INSERT INTO products (name, description, price, category_id, sku, created_at)
@@ -2083,11 +3031,9 @@ class ProductService:
         VALUES (?, ?, ?)
         """
         
-        conn = self.db.connect()
         try:
-            with conn:
-                cursor = conn.cursor()
-                now = datetime.datetime.utcnow().isoformat()
+            with self.db.transaction() as cursor:
+                now = self.db.now()
                 
                 # Insert product
                 cursor.execute(product_sql, (name, description, db_price, category_id, sku, now))
@@ -2102,10 +3048,77 @@ class ProductService:
                 logger.info(f"Added new product {name} (ID: {product_id}, SKU: {sku}) with stock {stock_quantity}")
                 return product_id
                 
+        except sqlite3.IntegrityError as e:
+            # SKU uniqueness is enforced by the UNIQUE constraint, not a lookup beforehand
+            if 'products.sku' in str(e):
+                raise ValidationError(f"SKU '{sku}' already exists.")
+            logger.error(f"Failed to add product {name}: {e}")
+            raise DatabaseError(f"Product creation failed: {e}")
         except sqlite3.Error as e:
             logger.error(f"Failed to add product {name}: {e}")
             raise DatabaseError(f"Product creation failed: {e}")
 
+    def add_products_bulk(self, products: List[Dict[str, Any]]) -> List[int]:
+        """
+        Adds many products in one transaction, with multi-row INSERTs for the
+        products and one executemany for their inventory rows. All or nothing.
+        :param products: Dictionaries with the add_product arguments as keys
+                         (name, description, price, category_id, stock_quantity, sku).
+        :return: The new product IDs, in input order.
+        """
+        rows = []
+        for product in products:
+            db_price = decimal_to_db(product['price'])
+            if db_price <= 0:
+                raise ValidationError(f"Price must be positive (SKU '{product['sku']}').")
+            if product['stock_quantity'] < 0:
+                raise ValidationError(f"Stock quantity cannot be negative (SKU '{product['sku']}').")
+            rows.append((product['name'], product['description'], db_price, product['category_id'], product['sku']))
+        
+        skus = [row[4] for row in rows]
+        if len(set(skus)) != len(skus):
+            raise ValidationError("Duplicate SKUs in product batch.")
+        
+        inventory_sql = """
+        INSERT INTO inventory (product_id, quantity, last_updated)
+        VALUES (?, ?, ?)
+        """
+        
+        try:
+            with self.db.transaction() as cursor:
+                now = self.db.now()
+                ids_by_sku: Dict[str, int] = {}
+                
+                for start in range(0, len(rows), BULK_INSERT_ROWS):
+                    chunk = rows[start:start + BULK_INSERT_ROWS]
+                    values = ", ".join(["(?, ?, ?, ?, ?, ?)"] * len(chunk))
+                    # RETURNING rows come back in no guaranteed order, so match them by SKU
+                    product_sql = f"""
+                    INSERT INTO products (name, description, price, category_id, sku, created_at)
+                    VALUES {values}
+                    RETURNING sku, product_id
+                    """
+                    params = [value for row in chunk for value in (*row, now)]
+                    ids_by_sku.update(cursor.execute(product_sql, params).fetchall())
+                
+                product_ids = [ids_by_sku[sku] for sku in skus]
+                cursor.executemany(inventory_sql, [
+                    (product_id, product['stock_quantity'], now)
+                    for product_id, product in zip(product_ids, products)
+                ])
+                
+        except sqlite3.IntegrityError as e:
+            if 'products.sku' in str(e):
+                raise ValidationError("One or more SKUs in the batch already exist.")
+            logger.error(f"Failed to add {len(rows)} products: {e}")
+            raise DatabaseError(f"Bulk product creation failed: {e}")
+        except sqlite3.Error as e:
+            logger.error(f"Failed to add {len(rows)} products: {e}")
+            raise DatabaseError(f"Bulk product creation failed: {e}")
+        
+        logger.info(f"Added {len(product_ids)} products in one batch.")
+        return product_ids
+
     def get_product_by_id(self, product_id: int) -> Optional[Dict[str, Any]]:
         """
         Retrieves a single product and its inventory level by ID.
@@ -2127,9 +3140,73 @@ class ProductService:
             return None
             
         product = dict(result[0])
+        product['price_cents'] = product['price']
         product['price'] = db_to_decimal(product['price'])
         return product
 
+    def get_stock_and_prices(self, product_ids: List[int]) -> Dict[int, sqlite3.Row]:
+        """
+        Fetches what order validation needs for many products: cached rows where
+        fresh, and one query for the rest. Cached stock may lag by up to
+        PRODUCT_CACHE_TTL_SECONDS; update_stock_bulk re-checks it when taking stock.
+        :param product_ids: The product IDs; duplicates are fine.
+        :return: A dictionary of product_id -> row (product_id, name, sku, price in cents,
+                 stock_quantity). Unknown IDs are absent.
+        """
+        now = time.monotonic()
+        found: Dict[int, sqlite3.Row] = {}
+        missing = []
+        with self._product_cache_lock:
+            for product_id in dict.fromkeys(product_ids):
+                cached = self._product_cache.get(product_id)
+                if cached is not None and cached[0] > now:
+                    self._product_cache.move_to_end(product_id)
+                    found[product_id] = cached[1]
+                else:
+                    missing.append(product_id)
+        
+        if missing:
+            marks = ", ".join(["?"] * len(missing))
+            sql = self.STOCK_AND_PRICE_SQL + f" WHERE p.product_id IN ({marks})"
+            rows = self.db.execute_query(sql, tuple(missing))
+            self._cache_products(rows)
+            found.update((row['product_id'], row) for row in rows)
+        return found
+
+    def prewarm_product_cache(self, limit: int = PRODUCT_PREWARM_COUNT) -> int:
+        """
+        Loads the best-selling products into the product cache in one query.
+        :param limit: How many products to load.
+        :return: The number of products cached.
+        """
+        sql = self.STOCK_AND_PRICE_SQL + """
+        JOIN product_sales_agg s ON s.product_id = p.product_id
+        ORDER BY s.total_quantity_sold DESC
+        LIMIT ?
+        """
+        rows = self.db.execute_query(sql, (limit,))
+        self._cache_products(rows)
+        logger.info(f"Prewarmed product cache with {len(rows)} products.")
+        return len(rows)
+
+    def _cache_products(self, rows: List[sqlite3.Row]):
+        expires_at = time.monotonic() + PRODUCT_CACHE_TTL_SECONDS
+        with self._product_cache_lock:
+            for row in rows:
+                self._product_cache[row['product_id']] = (expires_at, row)
+                self._product_cache.move_to_end(row['product_id'])
+            while len(self._product_cache) > PRODUCT_CACHE_SIZE:
+                self._product_cache.popitem(last=False)
+
+    def forget_products(self, product_ids: Iterable[int]):
+        """
+        Drops cached rows for products whose stock just changed.
+        :param product_ids: The product IDs to forget.
+        """
+        with self._product_cache_lock:
+            for product_id in product_ids:
+                self._product_cache.pop(product_id, None)
+
     def get_product_by_sku(self, sku: str) -> Optional[Dict[str, Any]]:
         """
         Retrieves a single product and its inventory level by SKU.
@@ -2151,6 +3228,7 @@ class ProductService:
             return None
             
         product = dict(result[0])
+        product['price_cents'] = product['price']
         product['price'] = db_to_decimal(product['price'])
         return product
 
@@ -2162,7 +3240,7 @@ class ProductService:
         :param quantity_change: The amount to add/subtract (e.g., -2 to subtract 2).
         :return: The new stock level.
         """
-        now = datetime.datetime.utcnow().isoformat()
+        now = self.db.now()
         
         # This SQL ensures we don't go below zero
         sql = """
@@ -2171,12 +3249,14 @@ class ProductService:
             quantity = quantity + ?,
             last_updated = ?
         WHERE product_id = ? AND (quantity + ?) >= 0
+        RETURNING quantity
         """
         
         params = (quantity_change, now, product_id, quantity_change)
-        rows_affected = self.db.execute_update(sql, params)
+        updated = self.db.execute_query(sql, params)
+        self.forget_products((product_id,))
         
-        if rows_affected == 0:
+        if not updated:
             # Check current stock to see why it failed
             current_stock = self.get_stock_level(product_id)
             if current_stock is None:
@@ -2186,10 +3266,62 @@ class ProductService:
                 raise InventoryError(f"Insufficient stock for product ID {product_id}. Available: {current_stock}, Requested: {abs(quantity_change)}")
             raise DatabaseError("Failed to update stock, unknown reason.")
 
-        new_stock = self.get_stock_level(product_id)
+        new_stock = updated[0]['quantity']
         logger.info(f"Updated stock for product_id {product_id} by {quantity_change}. New stock: {new_stock}")
         return new_stock
 
+    def update_stock_bulk(self, items: List[Tuple[int, int]]) -> Dict[int, int]:
+        """
+        Takes stock for many products in a single UPDATE. Either every product
+        has enough stock and all are decremented, or none are.
+        :param items: (product_id, quantity) pairs; repeated product IDs are summed.
+        :return: A dictionary of product_id -> new stock level.
+        """
+        totals: Dict[int, int] = {}
+        for product_id, quantity in items:
+            totals[product_id] = totals.get(product_id, 0) + quantity
+        
+        now = self.db.now()
+        values = ", ".join(["(?, ?)"] * len(totals))
+        sql = f"""
+        WITH ordered (product_id, quantity) AS (VALUES {values})
+        UPDATE inventory
+        SET 
+            quantity = inventory.quantity - ordered.quantity,
+            last_updated = ?
+        FROM ordered
+        WHERE inventory.product_id = ordered.product_id AND inventory.quantity >= ordered.quantity
+        RETURNING inventory.product_id, inventory.quantity
+        """
+        params = [value for pair in totals.items() for value in pair]
+        params.append(now)
+        
+        try:
+            with self.db.transaction() as cursor:
+                new_levels = dict(cursor.execute(sql, params).fetchall())
+                self.forget_products(totals)
+                short = [pid for pid in totals if pid not in new_levels]
+                if short:
+                    # One lookup for the failed rows only, to say what was available.
+                    # Rows already decremented by the UPDATE above are not in `short`.
+                    marks = ", ".join(["?"] * len(short))
+                    available = dict(cursor.execute(
+                        f"SELECT product_id, quantity FROM inventory WHERE product_id IN ({marks})", short
+                    ).fetchall())
+                    details = "; ".join(
+                        f"ID {pid}: requested {totals[pid]}, available {available.get(pid, 'none')}"
+                        for pid in short
+                    )
+                    logger.error(f"InventoryError: bulk stock update short for {details}")
+                    # Raising rolls back the partial decrement
+                    raise InventoryError(f"Insufficient stock for product ID(s) {short} ({details}).")
+        except sqlite3.Error as e:
+            logger.error(f"Failed bulk stock update for {len(totals)} products: {e}")
+            raise DatabaseError(f"Bulk stock update failed: {e}")
+        
+        logger.info(f"Took stock for {len(totals)} products in one update.")
+        return new_levels
+
     def get_stock_level(self, product_id: int) -> Optional[int]:
         """
         Gets the current stock level for a single product.
@@ -2200,7 +3332,7 @@ class ProductService:
         result = self.db.execute_query(sql, (product_id,))
         return result[0]['quantity'] if result else None
 
-    def search_products(self, search_term: str, category_id: Optional[int] = None, min_price: Optional[Decimal] = None, max_price: Optional[Decimal] = None, limit: int = 20) -> List[Dict[str, Any]]:
+    def search_products(self, search_term: str, category_id: Optional[int] = None, min_price: Optional[Decimal] = None, max_price: Optional[Decimal] = None, limit: int = 20) -> List['ProductService.SearchResult']:
         """
         Performs a complex search for products.
         :param search_term: Text to search in name and description.
@@ -2208,7 +3340,7 @@ class ProductService:
         :param min_price: Optional minimum price.
         :param max_price: Optional maximum price.
         :param limit: Max number of results.
-        :return: A list of product dictionaries.
+        :return: A list of SearchResult tuples.
         """
         
         # This query is complex and interdependent on multiple tables
@@ -2222,10 +3354,17 @@ class ProductService:
         JOIN categories c ON p.category_id = c.category_id
         JOIN inventory i ON p.product_id = i.product_id
         LEFT JOIN reviews r ON p.product_id = r.product_id
-        WHERE (p.name LIKE ? OR p.description LIKE ?)
         """
         
-        params = [f'%{search_term}%', f'%{search_term}%']
+        if len(search_term) >= 3:
+            # Quoted as a single FTS phrase, so user input can't inject query syntax
+            sql_base += " WHERE p.product_id IN (SELECT rowid FROM products_fts WHERE products_fts MATCH ?) "
+            params = ['"' + search_term.replace('"', '""') + '"']
+        else:
+            # Trigrams can't match terms shorter than 3 characters. One LIKE over
+            # both fields; the newline keeps a match from spanning name and description.
+            sql_base += " WHERE (p.name || char(10) || COALESCE(p.description, '')) LIKE ? ESCAPE '\\' "
+            params = [like_contains(search_term)]
         
         if category_id is not None:
             sql_base += " AND p.category_id = ? "
@@ -2250,14 +3389,11 @@ class ProductService:
         
         results = self.db.execute_query(full_sql, tuple(params))
         
-        # Convert price back to Decimal
-        products = []
-        for row in results:
-            product = dict(row)
-            product['price'] = db_to_decimal(product['price'])
-            products.append(product)
-            
-        return products
+        # Built positionally (column order matches SearchResult), converting price back to Decimal
+        return [
+            self.SearchResult(row[0], row[1], db_to_decimal(row[2]), *row[3:])
+            for row in results
+        ]
 
     def add_product_review(self, user_id: int, product_id: int, rating: int, review_text: str) -> int:
         """
@@ -2281,13 +3417,20 @@ class ProductService:
         INSERT INTO reviews (product_id, user_id, rating, review_text, created_at)
         VALUES (?, ?, ?, ?, ?)
         """
-        now = datetime.datetime.utcnow().isoformat()
-        review_id = self.db.execute_insert_get_id(sql, (product_id, user_id, rating, review_text, now))
+        now = self.db.now()
+        try:
+            with self.db.transaction() as cursor:
+                cursor.execute(sql, (product_id, user_id, rating, review_text, now))
+                review_id = cursor.lastrowid
+                
+                # This is interdependent: we immediately update the product's average rating,
+                # in the same transaction as the review
+                self.update_product_average_rating(product_id)
+        except sqlite3.Error as e:
+            logger.error(f"Failed to add review for product {product_id}: {e}")
+            raise DatabaseError(f"Review creation failed: {e}")
         logger.info(f"User {user_id} added review {review_id} for product {product_id} with rating {rating}")
         
-        # This is interdependent: we immediately update the product's average rating
-        self.update_product_average_rating(product_id)
-        
         return review_id
 
     def update_product_average_rating(self, product_id: int):
@@ -2297,26 +3440,18 @@ class ProductService:
         :param product_id: The product to update.
         """
         
-        # This SQL calculates the average from the reviews table
-        avg_sql = """
-        SELECT AVG(rating) as avg_rating
-        FROM reviews
-        WHERE product_id = ?
-        """
-        
-        result = self.db.execute_query(avg_sql, (product_id,))
-        avg_rating = result[0]['avg_rating'] if result and result[0]['avg_rating'] is not None else 0.0
-        
-        # This SQL updates the products table
+        # The average is computed and written by SQLite in one statement
         update_sql = """
         UPDATE products
-        SET average_rating = ?
+        SET average_rating = COALESCE(
+            (SELECT ROUND(AVG(rating), 2) FROM reviews WHERE product_id = ?), 0.0
+        )
         WHERE product_id = ?
         """
         
         try:
-            self.db.execute_update(update_sql, (round(avg_rating, 2), product_id))
-            logger.info(f"Updated average rating for product {product_id} to {avg_rating:.2f}")
+            self.db.execute_update(update_sql, (product_id, product_id))
+            logger.info(f"Updated average rating for product {product_id}")
         except DatabaseError as e:
             logger.error(f"Failed to update average rating for product {product_id}: {e}")
             # Non-fatal, don't crash the review submission
@@ -2331,17 +3466,23 @@ class OrderService:
     """
 
     CartItem = namedtuple('CartItem', ['product_id', 'quantity'])
+    ValidatedItem = namedtuple('ValidatedItem', ['product_id', 'quantity', 'price_at_purchase'])
 
-    def __init__(self, db_manager: DatabaseManager, user_service: UserService, product_service: ProductService):
+    def __init__(self, db_manager: DatabaseManager, user_service: UserService, product_service: ProductService,
+                 reporting_service: Optional['ReportingService'] = None):
         """
         Initializes the order service.
         :param db_manager: An instance of DatabaseManager.
         :param user_service: An instance of UserService.
         :param product_service: An instance of ProductService.
+        :param reporting_service: Optional. Its cached inventory report is dropped whenever stock moves.
         """
         self.db = db_manager
         self.users = user_service
         self.products = product_service
+        self.reports = reporting_service
+        # Most carts draw from the same popular products; load them up front
+        self.products.prewarm_product_cache()
         logger.info("OrderService initialized.")
 
     def create_order(self, user_id: int, cart: List[CartItem], shipping_address_id: int, billing_address_id: int, shipping_method: str = 'STANDARD') -> int:
@@ -2364,9 +3505,7 @@ class OrderService:
         
         # Validate user and addresses
         try:
-            user_profile = self.users.get_user_profile(user_id)
-            user_addresses = {addr['address_id'] for addr in user_profile['addresses']}
-            if shipping_address_id not in user_addresses or billing_address_id not in user_addresses:
+            if not self.users.owns_addresses(user_id, shipping_address_id, billing_address_id):
                 raise OrderProcessingError("Invalid shipping or billing address ID for this user.")
         except ValidationError as e:
             raise OrderProcessingError(f"Invalid user: {e}")
@@ -2374,11 +3513,13 @@ class OrderService:
         # --- 2. Pricing and Stock Check Phase ---
         
         # This block is highly interdependent on ProductService
-        subtotal = Decimal('0.00')
+        subtotal = 0  # cents
         validated_items = []
+        # One query for every product in the cart; the loop below is lookups only
+        products = self.products.get_stock_and_prices([item.product_id for item in cart])
         
         for item in cart:
-            product = self.products.get_product_by_id(item.product_id)
+            product = products.get(item.product_id)
             if not product:
                 raise OrderProcessingError(f"Product ID {item.product_id} not found.")
                 
@@ -2391,36 +3532,32 @@ class OrderService:
                 raise InventoryError(f"Insufficient stock for '{product['name']}'. Requested: {item.quantity}, Available: {current_stock}")
                 
             item_price = product['price']
-            line_total = item_price * Decimal(item.quantity)
+            line_total = item_price * item.quantity
             subtotal += line_total
             
-            validated_items.append({
-                'product_id': item.product_id,
-                'quantity': item.quantity,
-                'price_at_purchase': item_price  # Lock in the price
-            })
+            # Lock in the price
+            validated_items.append(self.ValidatedItem(item.product_id, item.quantity, item_price))
             
         # --- 3. Calculate Final Total ---
         
         shipping_fee = self.calculate_shipping(subtotal, shipping_method)
         total_amount = subtotal + shipping_fee
+        total_items = sum(item.quantity for item in validated_items)
         
         # --- 4. Database Transaction Phase ---
         
-        conn = self.db.connect()
         try:
-            with conn:
-                cursor = conn.cursor()
-                now = datetime.datetime.utcnow().isoformat()
+            with self.db.transaction() as cursor:
+                now = self.db.now()
                 
                 # Step 4a: Create the main order record
                 order_sql = """
-                INSERT INTO orders (user_id, status, total_amount, subtotal, shipping_fee, shipping_address_id, billing_address_id, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                INSERT INTO orders (user_id, status, total_amount, subtotal, shipping_fee, total_items, shipping_address_id, billing_address_id, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """
                 cursor.execute(order_sql, (
-                    user_id, STATUS_PENDING, decimal_to_db(total_amount), decimal_to_db(subtotal),
-                    decimal_to_db(shipping_fee), shipping_address_id, billing_address_id, now
+                    user_id, STATUS_PENDING, total_amount, subtotal,
+                    shipping_fee, total_items, shipping_address_id, billing_address_id, now
                 ))
                 order_id = cursor.lastrowid
                 if not order_id:
@@ -2428,41 +3565,24 @@ class OrderService:
                     
                 logger.info(f"Created order {order_id} for user {user_id}. Status: PENDING.")
                 
-                # Step 4b: Insert all order items
-                items_sql = """
+                # Step 4b: Insert all order items in one multi-row INSERT.
+                # MAX_ORDER_ITEMS keeps the bound parameters well under SQLite's limit.
+                values = ", ".join(["(?, ?, ?, ?)"] * len(validated_items))
+                items_sql = f"""
                 INSERT INTO order_items (order_id, product_id, quantity, price_at_purchase)
-                VALUES (?, ?, ?, ?)
+                VALUES {values}
                 """
-                item_data_tuples = [
-                    (order_id, item['product_id'], item['quantity'], decimal_to_db(item['price_at_purchase']))
-                    for item in validated_items
-                ]
-                cursor.executemany(items_sql, item_data_tuples)
+                item_params = [value for item in validated_items for value in (order_id, *item)]
+                cursor.execute(items_sql, item_params)
                 
                 # Step 4c: Update inventory (interdependent call)
-                # We do this inside the same transaction
-                # We need to use the *ProductService* but on the *current* connection/cursor
-                # This is tricky. A better design would have ProductService accept a cursor.
-                # For this sim, we'll just re-implement the stock update logic here.
-                
+                # ProductService shares our connection, so its update joins this
+                # transaction. Stock was checked in phase 2; if it changed since,
+                # this raises and the whole order rolls back.
                 logger.info(f"Updating inventory for {len(validated_items)} items in order {order_id}")
-                inventory_update_sql = """
-                UPDATE inventory
-                SET 
-                    quantity = quantity - ?,
-                    last_updated = ?
-                WHERE product_id = ? AND (quantity - ?) >= 0
-                """
-                for item in validated_items:
-                    rows_affected = cursor.execute(inventory_update_sql, (
-                        item['quantity'], now, item['product_id'], item['quantity']
-                    )).rowcount
-                    
-                    if rows_affected == 0:
-                        # This should have been caught in phase 2, but this is a final check
-                        # If it fails here, the transaction rolls back.
-                        product = self.products.get_product_by_id(item['product_id'])
-                        raise InventoryError(f"Failed to reserve stock for '{product['name']}'. Stock may have changed. Please try again.")
+                self.products.update_stock_bulk([
+                    (item.product_id, item.quantity) for item in validated_items
+                ])
 
                 # Step 4d: Add an entry to order_status_history
                 history_sql = """
@@ -2472,7 +3592,9 @@ class OrderService:
                 cursor.execute(history_sql, (order_id, STATUS_PENDING, now))
             
             # Transaction commits here
-            logger.info(f"Successfully created and reserved stock for order {order_id}. Total: {total_amount}")
+            if self.reports:
+                self.reports.forget_reports('get_inventory_stock_report')
+            logger.info(f"Successfully created and reserved stock for order {order_id}. Total: {db_to_decimal(total_amount)}")
             return order_id
             
         except (sqlite3.Error, InventoryError, DatabaseError) as e:
@@ -2482,20 +3604,14 @@ class OrderService:
                 raise  # Re-raise the specific error
             raise OrderProcessingError(f"Order creation failed due to a database error: {e}")
 
-    def calculate_shipping(self, subtotal: Decimal, method: str) -> Decimal:
+    def calculate_shipping(self, subtotal: int, method: str) -> int:
         """
         Calculates shipping fee based on subtotal and method.
-        :param subtotal: The order subtotal.
+        :param subtotal: The order subtotal, in cents.
         :param method: 'STANDARD' or 'EXPRESS'.
-        :return: The shipping fee.
+        :return: The shipping fee, in cents.
         """
-        if subtotal >= FREE_SHIPPING_THRESHOLD and method == 'STANDARD':
-            return Decimal('0.00')
-            
-        if method == 'EXPRESS':
-            return SHIPPING_FEE_EXPRESS
-            
-        return SHIPPING_FEE_STANDARD
+        return SHIPPING_FEES.get((method, subtotal >= FREE_SHIPPING_THRESHOLD), SHIPPING_FEE_STANDARD)
 
     def update_order_status(self, order_id: int, new_status: str, admin_user_id: Optional[int] = None) -> bool:
         """
@@ -2509,45 +3625,47 @@ class OrderService:
             raise ValidationError(f"Invalid order status: {new_status}")
             
         if admin_user_id:
-            admin = self.users.find_user_by_id(admin_user_id)
-            if not admin or admin['role'] not in (ROLE_ADMIN, ROLE_SUPPORT):
+            if self.users.get_user_role(admin_user_id) not in (ROLE_ADMIN, ROLE_SUPPORT):
                 raise AuthenticationError("You do not have permission to update order status.")
         
-        # Get current status
-        current_status_res = self.db.execute_query("SELECT status FROM orders WHERE order_id = ?", (order_id,))
-        if not current_status_res:
-            raise OrderProcessingError(f"Order ID {order_id} not found.")
-        current_status = current_status_res[0]['status']
-
-        if current_status == new_status:
-            return True # No change needed
-
-        # Add state transition logic
-        if current_status == STATUS_CANCELLED or current_status == STATUS_REFUNDED:
-            raise OrderProcessingError(f"Cannot change status of a {current_status} order.")
-        
         # --- Transaction to update status and log history ---
-        conn = self.db.connect()
         try:
-            with conn:
-                now = datetime.datetime.utcnow().isoformat()
+            with self.db.transaction() as cursor:
+                now = self.db.now()
                 
-                # Step 1: Update the order
-                order_update_sql = "UPDATE orders SET status = ? WHERE order_id = ?"
-                conn.execute(order_update_sql, (new_status, order_id))
+                # Step 1: Update the order. The transition rules are in the WHERE
+                # clause, so checking and changing the status is one atomic statement.
+                order_update_sql = """
+                UPDATE orders SET status = ?
+                WHERE order_id = ? AND status NOT IN (?, ?, ?)
+                RETURNING order_id
+                """
+                updated = cursor.execute(order_update_sql, (
+                    new_status, order_id, new_status, STATUS_CANCELLED, STATUS_REFUNDED
+                )).fetchone()
+                if updated is None:
+                    # Only the refusal path reads the current status, to say why
+                    current = cursor.execute("SELECT status FROM orders WHERE order_id = ?", (order_id,)).fetchone()
+                    if current is None:
+                        raise OrderProcessingError(f"Order ID {order_id} not found.")
+                    if current['status'] == new_status:
+                        return True # No change needed
+                    raise OrderProcessingError(f"Cannot change status of a {current['status']} order.")
                 
                 # Step 2: Log the change
                 history_sql = """
                 INSERT INTO order_status_history (order_id, status, changed_at, changed_by_user_id)
                 VALUES (?, ?, ?, ?)
                 """
-                conn.execute(history_sql, (order_id, new_status, now, admin_user_id))
+                cursor.execute(history_sql, (order_id, new_status, now, admin_user_id))
                 
                 # Step 3: Interdependent action: Handle refunds
                 if new_status == STATUS_CANCELLED or new_status == STATUS_REFUNDED:
                     # This function is interdependent with ProductService
-                    self.restock_cancelled_order_items(order_id, conn)
+                    self.restock_cancelled_order_items(order_id, cursor.connection)
             
+            if self.reports and new_status in (STATUS_CANCELLED, STATUS_REFUNDED):
+                self.reports.forget_reports('get_inventory_stock_report')
             logger.info(f"Order {order_id} status updated to {new_status}" + (f" by user {admin_user_id}" if admin_user_id else ""))
             return True
 
@@ -2580,17 +3698,15 @@ class OrderService:
                 last_updated = ?
             WHERE product_id = ?
             """
-            now = datetime.datetime.utcnow().isoformat()
+            now = self.db.now()
             
-            for item in items:
-                # Use the ProductService to update stock
-                # This is complex. We're inside the OrderService transaction,
-                # so we can't use self.products.update_product_stock directly
-                # as it would start a *new* transaction.
-                # We must execute the query on the provided connection.
-                
-                db_conn.execute(inventory_update_sql, (item['quantity'], now, item['product_id']))
-                logger.info(f"Restocked {item['quantity']} of product {item['product_id']} from order {order_id}")
+            # We're inside the OrderService transaction, so the updates run
+            # on the provided connection, as one batch.
+            db_conn.executemany(inventory_update_sql, [
+                (item['quantity'], now, item['product_id']) for item in items
+            ])
+            self.products.forget_products(item['product_id'] for item in items)
+            logger.info(f"Restocked {len(items)} product lines from order {order_id}")
 
         except sqlite3.Error as e:
             logger.error(f"CRITICAL: Failed to restock items for order {order_id} during cancellation: {e}")
@@ -2642,12 +3758,18 @@ class OrderService:
         ORDER BY h.changed_at ASC
         """
         
-        order_res = self.db.execute_query(order_sql, (order_id,))
-        if not order_res:
-            raise OrderProcessingError(f"Order ID {order_id} not found.")
-            
-        items_res = self.db.execute_query(items_sql, (order_id,))
-        history_res = self.db.execute_query(history_sql, (order_id,))
+        # All three run on one pooled connection, reusing its cached statements
+        try:
+            with self.db.acquire() as conn:
+                cursor = conn.cursor()
+                order_res = cursor.execute(order_sql, (order_id,)).fetchall()
+                if not order_res:
+                    raise OrderProcessingError(f"Order ID {order_id} not found.")
+                items_res = cursor.execute(items_sql, (order_id,)).fetchall()
+                history_res = cursor.execute(history_sql, (order_id,)).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to load details for order {order_id}: {e}")
+            raise DatabaseError(f"Order details query failed: {e}")
         
         # Assemble the final nested dictionary
         order_data = dict(order_res[0])
@@ -2658,13 +3780,11 @@ class OrderService:
         order_data['shipping_fee'] = db_to_decimal(order_data['shipping_fee'])
         
         # Format items
-        order_items = []
-        for row in items_res:
-            item = dict(row)
-            item['price_at_purchase'] = db_to_decimal(item['price_at_purchase'])
-            order_items.append(item)
-            
-        order_data['items'] = order_items
+        to_decimal = db_to_decimal
+        order_data['items'] = [
+            {**dict(row), 'price_at_purchase': to_decimal(row['price_at_purchase'])}
+            for row in items_res
+        ]
         order_data['status_history'] = [dict(row) for row in history_res]
         
         return order_data
@@ -2672,10 +3792,34 @@ class OrderService:
 
 # --- Reporting Service Class ---
 
+def cached_report(method):
+    """
+    Caches a ReportingService method's result per argument set, for
+    REPORT_CACHE_TTL_SECONDS. See ReportingService.forget_reports.
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        with self._report_cache_lock:
+            cached = self._report_cache.get(key)
+            if cached is not None and cached[0] > time.monotonic():
+                self._report_cache.move_to_end(key)
+                return cached[1]
+        
+        report = method(self, *args, **kwargs)
+        with self._report_cache_lock:
+            self._report_cache[key] = (time.monotonic() + REPORT_CACHE_TTL_SECONDS, report)
+            self._report_cache.move_to_end(key)
+            if len(self._report_cache) > REPORT_CACHE_SIZE:
+                self._report_cache.popitem(last=False)
+        return report
+    return wrapper
+
 class ReportingService:
     """
     Generates complex, read-only reports for business analytics.
     These queries are often the most complex and interdependent.
+    Results are cached briefly; cached reports are shared, so callers must not modify them.
     """
     
     def __init__(self, db_manager: DatabaseManager):
@@ -2684,8 +3828,23 @@ class ReportingService:
         :param db_manager: An instance of DatabaseManager.
         """
         self.db = db_manager
+        self._report_cache: OrderedDict = OrderedDict()
+        self._report_cache_lock = threading.Lock()
         logger.info("ReportingService initialized.")
 
+    def forget_reports(self, *report_names: str):
+        """
+        Drops cached results, e.g. after the data behind them changed.
+        :param report_names: Method names to forget; forgets every report if none are given.
+        """
+        with self._report_cache_lock:
+            if not report_names:
+                self._report_cache.clear()
+                return
+            for key in [key for key in self._report_cache if key[0] in report_names]:
+                del self._report_cache[key]
+
+    @cached_report
     def get_sales_summary_by_date_range(self, start_date: str, end_date: str) -> Dict[str, Any]:
         """
         Generates a sales summary (total revenue, orders, items) for a date range.
@@ -2694,19 +3853,18 @@ class ReportingService:
         :return: A dictionary containing the summary.
         """
         
-        # This query joins orders and order_items and filters by date
+        # Filters orders by date alone; item counts are stored on each order.
         # It excludes cancelled/refunded orders from revenue.
         sql = """
         SELECT
-            COUNT(DISTINCT o.order_id) as total_orders,
-            SUM(o.total_amount) as total_revenue,
-            SUM(oi.quantity) as total_items_sold,
-            AVG(o.total_amount) as average_order_value
-        FROM orders o
-        JOIN order_items oi ON o.order_id = oi.order_id
-        WHERE o.created_at >= ? 
-          AND o.created_at <= ?
-          AND o.status NOT IN (?, ?)
+            COUNT(*) as total_orders,
+            SUM(total_amount) as total_revenue,
+            SUM(total_items) as total_items_sold,
+            CAST(ROUND(AVG(total_amount)) AS INTEGER) as average_order_value
+        FROM orders
+        WHERE created_at >= ? 
+          AND created_at <= ?
+          AND status NOT IN (?, ?)
         """
         
         # Add time to end_date to make it inclusive
@@ -2719,13 +3877,14 @@ class ReportingService:
         summary = dict(result[0])
         
         # Convert Decimals
-        summary['total_revenue'] = db_to_decimal(summary['total_revenue'] or '0.00')
-        summary['average_order_value'] = db_to_decimal(summary['average_order_value'] or '0.00')
+        summary['total_revenue'] = db_to_decimal(summary['total_revenue'] or 0)
+        summary['average_order_value'] = db_to_decimal(summary['average_order_value'] or 0)
         summary['total_orders'] = summary['total_orders'] or 0
         summary['total_items_sold'] = summary['total_items_sold'] or 0
         
         return summary
 
+    @cached_report
     def get_top_selling_products(self, limit: int = 10) -> List[Dict[str, Any]]:
         """
         Gets the top-selling products by quantity sold.
@@ -2733,34 +3892,27 @@ class ReportingService:
         :return: A list of product summary dictionaries.
         """
         
-        # This query joins products, order_items, and orders
+        # Reads the trigger-maintained totals instead of aggregating all order history
         sql = """
         SELECT
             p.product_id,
             p.name,
             p.sku,
-            SUM(oi.quantity) as total_quantity_sold,
-            SUM(oi.quantity * oi.price_at_purchase) as total_revenue
-        FROM products p
-        JOIN order_items oi ON p.product_id = oi.product_id
-        JOIN orders o ON oi.order_id = o.order_id
-        WHERE o.status NOT IN (?, ?)
-        GROUP BY p.product_id, p.name, p.sku
-        ORDER BY total_quantity_sold DESC
+            s.total_quantity_sold,
+            s.total_revenue
+        FROM product_sales_agg s
+        JOIN products p ON p.product_id = s.product_id
+        WHERE s.total_quantity_sold > 0
+        ORDER BY s.total_quantity_sold DESC
         LIMIT ?
         """
         
-        params = (STATUS_CANCELLED, STATUS_REFUNDED, limit)
-        results = self.db.execute_query(sql, params)
+        results = self.db.execute_query(sql, (limit,))
         
-        top_products = []
-        for row in results:
-            product = dict(row)
-            product['total_revenue'] = db_to_decimal(product['total_revenue'])
-            top_products.append(product)
-            
-        return top_products
+        to_decimal = db_to_decimal
+        return [{**dict(row), 'total_revenue': to_decimal(row['total_revenue'])} for row in results]
 
+    @cached_report
     def get_customer_lifetime_value_report(self, limit: int = 25) -> List[Dict[str, Any]]:
         """
         Generates a report of top customers by total amount spent (LTV).
@@ -2788,14 +3940,10 @@ class ReportingService:
         params = (STATUS_CANCELLED, STATUS_REFUNDED, limit)
         results = self.db.execute_query(sql, params)
         
-        top_customers = []
-        for row in results:
-            customer = dict(row)
-            customer['lifetime_value'] = db_to_decimal(customer['lifetime_value'])
-            top_customers.append(customer)
-            
-        return top_customers
+        to_decimal = db_to_decimal
+        return [{**dict(row), 'lifetime_value': to_decimal(row['lifetime_value'])} for row in results]
 
+    @cached_report
     def get_inventory_stock_report(self, low_stock_threshold: int = 10) -> Dict[str, List[Dict[str, Any]]]:
         """
         Generates a report of all inventory, highlighting low-stock items.
@@ -2817,20 +3965,21 @@ class ReportingService:
         ORDER BY i.quantity ASC
         """
         
-        results = self.db.execute_query(sql)
-        
         report = {
             'low_stock': [],
             'in_stock': []
         }
         
-        for row in results:
-            item = dict(row)
-            if item['quantity'] <= low_stock_threshold:
-                report['low_stock'].append(item)
-            else:
-                report['in_stock'].append(item)
-                
+        # Streamed in chunks; rows arrive in quantity order, so once one is above
+        # the threshold every later row is too
+        rows = self.db.execute_query_iter(sql)
+        for row in rows:
+            if row['quantity'] > low_stock_threshold:
+                report['in_stock'].append(dict(row))
+                break
+            report['low_stock'].append(dict(row))
+        report['in_stock'].extend(dict(row) for row in rows)
+        
         return report
 
 
@@ -2890,7 +4039,7 @@ def setup_database_schema(db_manager: DatabaseManager):
         product_id INTEGER PRIMARY KEY AUTOINCREMENT,
         name TEXT NOT NULL,
         description TEXT,
-        price TEXT NOT NULL, -- Stored as string to avoid precision loss
+        price INTEGER NOT NULL, -- In cents, to avoid precision loss
         category_id INTEGER NOT NULL,
         sku TEXT UNIQUE NOT NULL,
         average_rating REAL DEFAULT 0.0,
@@ -2901,6 +4050,22 @@ def setup_database_schema(db_manager: DatabaseManager):
     CREATE INDEX IF NOT EXISTS idx_products_name ON products (name);
     CREATE INDEX IF NOT EXISTS idx_products_category_id ON products (category_id);
 
+    -- Full-text index over product name/description, kept in sync by triggers.
+    -- The trigram tokenizer matches arbitrary substrings, like LIKE '%term%'.
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, description, content='products', content_rowid='product_id', tokenize='trigram'
+    );
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts (rowid, name, description) VALUES (new.product_id, new.name, new.description);
+    END;
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts (products_fts, rowid, name, description) VALUES ('delete', old.product_id, old.name, old.description);
+    END;
+    CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, description ON products BEGIN
+        INSERT INTO products_fts (products_fts, rowid, name, description) VALUES ('delete', old.product_id, old.name, old.description);
+        INSERT INTO products_fts (rowid, name, description) VALUES (new.product_id, new.name, new.description);
+    END;
+
     -- Inventory Table: Tracks stock for each product
     CREATE TABLE IF NOT EXISTS inventory (
         product_id INTEGER PRIMARY KEY,
@@ -2908,15 +4073,18 @@ def setup_database_schema(db_manager: DatabaseManager):
         last_updated TEXT NOT NULL,
         FOREIGN KEY (product_id) REFERENCES products (product_id) ON DELETE CASCADE
     );
+    -- Lets the stock report walk inventory in quantity order without sorting
+    CREATE INDEX IF NOT EXISTS idx_inventory_quantity ON inventory (quantity);
 
     -- Orders Table: The main record for each order
     CREATE TABLE IF NOT EXISTS orders (
         order_id INTEGER PRIMARY KEY AUTOINCREMENT,
         user_id INTEGER NOT NULL,
         status TEXT NOT NULL CHECK(status IN ('PENDING', 'PAID', 'SHIPPED', 'DELIVERED', 'CANCELLED', 'REFUNDED')),
-        total_amount TEXT NOT NULL,
-        subtotal TEXT NOT NULL,
-        shipping_fee TEXT NOT NULL,
+        total_amount INTEGER NOT NULL, -- Money columns are in cents
+        subtotal INTEGER NOT NULL,
+        shipping_fee INTEGER NOT NULL,
+        total_items INTEGER NOT NULL DEFAULT 0, -- Sum of line quantities, kept so reports needn't join order_items
         shipping_address_id INTEGER NOT NULL,
         billing_address_id INTEGER NOT NULL,
         created_at TEXT NOT NULL,
@@ -2924,9 +4092,14 @@ def setup_database_schema(db_manager: DatabaseManager):
         FOREIGN KEY (shipping_address_id) REFERENCES addresses (address_id) ON DELETE RESTRICT,
         FOREIGN KEY (billing_address_id) REFERENCES addresses (address_id) ON DELETE RESTRICT
     );
-    CREATE INDEX IF NOT EXISTS idx_orders_user_id ON orders (user_id);
+    -- The user and date indexes also carry status and total_amount, so the
+    -- lifetime-value and sales-summary reports are answered from the index alone
+    DROP INDEX IF EXISTS idx_orders_user_id;
+    DROP INDEX IF EXISTS idx_orders_created_at;
+    DROP INDEX IF EXISTS idx_orders_created_status;
+    CREATE INDEX IF NOT EXISTS idx_orders_user_status ON orders (user_id, status, total_amount);
     CREATE INDEX IF NOT EXISTS idx_orders_status ON orders (status);
-    CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders (created_at);
+    CREATE INDEX IF NOT EXISTS idx_orders_created_cover ON orders (created_at, status, total_amount, total_items);
 
     -- Order Items Table: Links products to orders (line items)
     CREATE TABLE IF NOT EXISTS order_items (
@@ -2934,12 +4107,44 @@ def setup_database_schema(db_manager: DatabaseManager):
         order_id INTEGER NOT NULL,
         product_id INTEGER NOT NULL,
         quantity INTEGER NOT NULL CHECK(quantity > 0),
-        price_at_purchase TEXT NOT NULL, -- Price at the time of order
+        price_at_purchase INTEGER NOT NULL, -- Price at the time of order, in cents
         FOREIGN KEY (order_id) REFERENCES orders (order_id) ON DELETE CASCADE,
         FOREIGN KEY (product_id) REFERENCES products (product_id) ON DELETE RESTRICT
     );
-    CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items (order_id);
-    CREATE INDEX IF NOT EXISTS idx_order_items_product_id ON order_items (product_id);
+    -- Covering indexes: order lookups and per-product sales totals never touch the table
+    DROP INDEX IF EXISTS idx_order_items_order_id;
+    DROP INDEX IF EXISTS idx_order_items_product_id;
+    CREATE INDEX IF NOT EXISTS idx_order_items_order_cover ON order_items (order_id, product_id, quantity, price_at_purchase);
+    CREATE INDEX IF NOT EXISTS idx_order_items_product_cover ON order_items (product_id, order_id, quantity, price_at_purchase);
+
+    -- Product Sales Summary: running totals for the top-selling report, excluding
+    -- cancelled/refunded orders. Kept in sync by triggers, so it is always current.
+    CREATE TABLE IF NOT EXISTS product_sales_agg (
+        product_id INTEGER PRIMARY KEY,
+        total_quantity_sold INTEGER NOT NULL DEFAULT 0,
+        total_revenue INTEGER NOT NULL DEFAULT 0, -- In cents
+        FOREIGN KEY (product_id) REFERENCES products (product_id) ON DELETE CASCADE
+    );
+    CREATE INDEX IF NOT EXISTS idx_product_sales_agg_quantity ON product_sales_agg (total_quantity_sold);
+    CREATE TRIGGER IF NOT EXISTS product_sales_agg_ai AFTER INSERT ON order_items BEGIN
+        INSERT INTO product_sales_agg (product_id, total_quantity_sold, total_revenue)
+        VALUES (new.product_id, new.quantity, new.quantity * new.price_at_purchase)
+        ON CONFLICT (product_id) DO UPDATE SET
+            total_quantity_sold = total_quantity_sold + excluded.total_quantity_sold,
+            total_revenue = total_revenue + excluded.total_revenue;
+    END;
+    CREATE TRIGGER IF NOT EXISTS product_sales_agg_cancel AFTER UPDATE OF status ON orders
+    WHEN new.status IN ('CANCELLED', 'REFUNDED') AND old.status NOT IN ('CANCELLED', 'REFUNDED') BEGIN
+        UPDATE product_sales_agg
+        SET
+            total_quantity_sold = total_quantity_sold - sold.quantity,
+            total_revenue = total_revenue - sold.revenue
+        FROM (
+            SELECT product_id, SUM(quantity) AS quantity, SUM(quantity * price_at_purchase) AS revenue
+            FROM order_items WHERE order_id = new.order_id GROUP BY product_id
+        ) AS sold
+        WHERE product_sales_agg.product_id = sold.product_id;
+    END;
 
     -- Reviews Table: User reviews for products
     CREATE TABLE IF NOT EXISTS reviews (
@@ -2953,7 +4158,9 @@ def setup_database_schema(db_manager: DatabaseManager):
         FOREIGN KEY (user_id) REFERENCES users (user_id) ON DELETE CASCADE,
         UNIQUE (product_id, user_id) -- One review per user per product
     );
-    CREATE INDEX IF NOT EXISTS idx_reviews_product_id ON reviews (product_id);
+    -- Covers the AVG(rating) lookups by product without touching the table
+    DROP INDEX IF EXISTS idx_reviews_product_id;
+    CREATE INDEX IF NOT EXISTS idx_reviews_product_rating ON reviews (product_id, rating);
 
     -- Order Status History Table: Logs all status changes for an order
     CREATE TABLE IF NOT EXISTS order_status_history (
@@ -2966,10 +4173,41 @@ def setup_database_schema(db_manager: DatabaseManager):
         FOREIGN KEY (changed_by_user_id) REFERENCES users (user_id) ON DELETE SET NULL
     );
     CREATE INDEX IF NOT EXISTS idx_order_status_history_order_id ON order_status_history (order_id);
+
+    -- Refresh planner statistics where they are missing or stale (cheap when nothing changed)
+    PRAGMA optimize;
+    """
+    
+    # Fills product_sales_agg from order history, when the table is first created
+    sales_backfill_sql = """
+    INSERT INTO product_sales_agg (product_id, total_quantity_sold, total_revenue)
+    SELECT oi.product_id, SUM(oi.quantity), SUM(oi.quantity * oi.price_at_purchase)
+    FROM order_items oi
+    JOIN orders o ON oi.order_id = o.order_id
+    WHERE o.status NOT IN (?, ?)
+    GROUP BY oi.product_id
+    """
+    
+    # Adds orders.total_items to databases created before it existed
+    total_items_migration = """
+    ALTER TABLE orders ADD COLUMN total_items INTEGER NOT NULL DEFAULT 0;
+    UPDATE orders SET total_items = COALESCE(
+        (SELECT SUM(quantity) FROM order_items WHERE order_items.order_id = orders.order_id), 0
+    );
     """
     
     try:
+        order_columns = {row['name'] for row in db_manager.execute_query("SELECT name FROM pragma_table_info('orders')")}
+        if order_columns and 'total_items' not in order_columns:
+            db_manager.execute_script(total_items_migration)
+        fts_exists = db_manager.execute_query("SELECT 1 FROM sqlite_master WHERE name = 'products_fts'")
+        sales_agg_exists = db_manager.execute_query("SELECT 1 FROM sqlite_master WHERE name = 'product_sales_agg'")
         db_manager.execute_script(schema_script)
+        if not fts_exists:
+            # Index any products that predate the full-text table
+            db_manager.execute_update("INSERT INTO products_fts (products_fts) VALUES ('rebuild')")
+        if not sales_agg_exists:
+            db_manager.execute_update(sales_backfill_sql, (STATUS_CANCELLED, STATUS_REFUNDED))
         logger.info("Database schema verified/created successfully.")
     except DatabaseError as e:
         logger.critical(f"FATAL: Could not initialize database schema: {e}")
@@ -2991,8 +4229,8 @@ def main():
     
     user_service = UserService(db_manager)
     product_service = ProductService(db_manager)
-    order_service = OrderService(db_manager, user_service, product_service)
     reporting_service = ReportingService(db_manager)
+    order_service = OrderService(db_manager, user_service, product_service, reporting_service)
     
     logger.info("All services initialized.")
     
@@ -3008,6 +4246,7 @@ def main():
             db_manager.execute_update("UPDATE users SET role = ? WHERE email = ?", (ROLE_ADMIN, "admin@example.com"))
             admin_user = user_service.find_user_by_email("admin@example.com")
             admin_id = admin_user['user_id']
+            user_service.forget_role(admin_id)
             logger.info(f"Admin user created/promoted with ID: {admin_id}")
 
         user_id_1 = user_service.register_user("alice@example.com", "AlicePass123", "Alice", "Smith")
@@ -3018,9 +4257,14 @@ def main():
         cat_id_electronics = product_service.add_product_category("Electronics", "Gadgets and devices")
         cat_id_books = product_service.add_product_category("Books", "Paperback and hardcover books")
         
-        prod_id_laptop = product_service.add_product("Pro Laptop 15\"", "A powerful laptop", Decimal("1299.99"), cat_id_electronics, 50, "SKU-LAP-001")
-        prod_id_phone = product_service.add_product("Smart Phone X", "The latest smartphone", Decimal("799.00"), cat_id_electronics, 150, "SKU-PHN-002")
-        prod_id_book = product_service.add_product("Database Design", "A book on SQL", Decimal("49.95"), cat_id_books, 200, "SKU-BOK-003")
+        prod_id_laptop, prod_id_phone, prod_id_book = product_service.add_products_bulk([
+            {'name': "Pro Laptop 15\"", 'description': "A powerful laptop", 'price': Decimal("1299.99"),
+             'category_id': cat_id_electronics, 'stock_quantity': 50, 'sku': "SKU-LAP-001"},
+            {'name': "Smart Phone X", 'description': "The latest smartphone", 'price': Decimal("799.00"),
+             'category_id': cat_id_electronics, 'stock_quantity': 150, 'sku': "SKU-PHN-002"},
+            {'name': "Database Design", 'description': "A book on SQL", 'price': Decimal("49.95"),
+             'category_id': cat_id_books, 'stock_quantity': 200, 'sku': "SKU-BOK-003"},
+        ])
 
         # --- Demo 3: Users update profile and add reviews ---
         logger.info("Demo 3: Updating profiles and adding reviews...")
@@ -3032,7 +4276,7 @@ def main():
             'country': 'USA'
         })
         profile = user_service.get_user_profile(user_id_1)
-        alice_addr_id = profile['addresses'][0]['address_id']
+        alice_addr_id = profile['addresses'][0].address_id
         
         product_service.add_product_review(user_id_1, prod_id_laptop, 5, "Amazing laptop! Super fast.")
         product_service.add_product_review(user_id_2, prod_id_laptop, 4, "Pretty good, but battery could be better.")
@@ -3090,7 +4334,7 @@ def main():
         # --- Demo 8: Run Reports ---
         logger.info("Demo 8: Running reports...")
         
-        sales_summary = reporting_service.get_sales_summary_by_date_range('2020-01-01', datetime.datetime.utcnow().strftime('%Y-%m-%d'))
+        sales_summary = reporting_service.get_sales_summary_by_date_range('2020-01-01', time.strftime('%Y-%m-%d', time.gmtime()))
         logger.info(f"Sales Summary: {json.dumps(sales_summary, default=str, indent=2)}")
         
         top_products = reporting_service.get_top_selling_products()